@@ -0,0 +1,204 @@
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+from typing import Literal, get_args
+
+from runners.run import run_optimization
+from utils.search_utils import DEFAULT_MAX_ITER, Engine
+
+
+def _read_manifest(fmanifest: Path) -> list[tuple[Path, str]]:
+    # one site per line: `<input path> [<output name>]`, paths relative to the
+    # manifest, blank lines and `#` comments are skipped
+    sites: list[tuple[Path, str]] = []
+    with fmanifest.open(mode="r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            tokens = line.split()
+            fin = fmanifest.parent / tokens[0]
+            name = tokens[1] if len(tokens) > 1 else fin.stem
+            sites.append((fin, name))
+    return sites
+
+
+def _collect_sites(source: Path) -> list[tuple[Path, str]]:
+    if source.is_dir():
+        return [(fin, fin.stem) for fin in sorted(source.glob("*.txt"))]
+    return _read_manifest(source)
+
+
+def _check_names(sites: list[tuple[Path, str]]) -> None:
+    # every site writes `<name>.txt` and `<name>.json` into the same directory
+    seen: dict[str, Path] = {}
+    for fin, name in sites:
+        if name in seen:
+            raise ValueError(
+                f"duplicate output name {name!r} ({seen[name]} and {fin}), "
+                "give one of them an explicit name in the manifest"
+            )
+        seen[name] = fin
+
+
+def _check_outputs(sites: list[tuple[Path, str]], out_dir: Path) -> None:
+    # e.g. `--out-dir` set to the input directory, where `<stem>.txt` is the input
+    for fin, name in sites:
+        if (out_dir / f"{name}.txt").resolve() == fin.resolve():
+            raise ValueError(f"the output of {name!r} would overwrite {fin}")
+
+
+def _solve_site(
+    fin: Path,
+    name: str,
+    out_dir: Path,
+    days: int,
+    max_iter: int | None,
+    seed: int,
+    engine: Engine,
+    time_budget: float | None,
+    init: Literal["greedy", "flow"],
+) -> dict:
+    telemetry = run_optimization(
+        fin.name,
+        f"{name}.txt",
+        days,
+        max_iter,
+        seed,
+        engine=engine,
+        time_budget=time_budget,
+        init=init,
+        telemetry_file_name=f"{name}.json",
+        input_dir=fin.parent,
+        output_dir=out_dir,
+        quiet=True,
+    )
+    telemetry["search"].pop("trajectory", None)
+    telemetry["site"] = name
+    return telemetry
+
+
+def run_batch(
+    sites: list[tuple[Path, str]],
+    out_dir: Path,
+    workers: int | None,
+    days: int,
+    max_iter: int | None,
+    seed: int,
+    engine: Engine = "hill",
+    time_budget: float | None = None,
+    init: Literal["greedy", "flow"] = "greedy",
+) -> dict:
+    _check_names(sites)
+    _check_outputs(sites, out_dir)
+    t1 = perf_counter()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    iterations = 0
+    solved = 0
+
+    with (
+        ProcessPoolExecutor(max_workers=workers) as pool,
+        open(file=out_dir / "metrics.jsonl", encoding="utf-8", mode="w") as fmetrics,
+    ):
+        futures = {
+            pool.submit(
+                _solve_site,
+                fin,
+                name,
+                out_dir,
+                days,
+                max_iter,
+                seed,
+                engine,
+                time_budget,
+                init,
+            ): name
+            for fin, name in sites
+        }
+
+        # stream every site as soon as it is done
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                telemetry = future.result()
+            except Exception as e:
+                print(f" • {name}: FAILED ({e})")
+                fmetrics.write(json.dumps({"site": name, "error": str(e)}) + "\n")
+                fmetrics.flush()
+                continue
+
+            solved += 1
+            iterations += telemetry["search"].get("iterations", 0)
+            scores = telemetry["scores"]
+            print(
+                f" • {name}: PrefScore {scores['pref'][1]:.4f}, "
+                f"CoverageScore {scores['cov'][1]:.4f}, "
+                f"penalty {scores['penalty'][1]}, {telemetry['total']:.4f} s"
+            )
+            fmetrics.write(json.dumps(telemetry) + "\n")
+            fmetrics.flush()
+
+    t_d = perf_counter() - t1
+    summary = {
+        "sites": len(sites),
+        "solved": solved,
+        "time": t_d,
+        "sites_per_sec": solved / t_d if t_d > 0 else 0.0,
+        "iterations_per_sec": iterations / t_d if t_d > 0 else 0.0,
+    }
+    print(
+        f"\n • {solved}/{len(sites)} sites in {t_d:.4f} s "
+        f"({summary['sites_per_sec']:.2f} sites/s, "
+        f"{summary['iterations_per_sec']:.0f} iterations/s)"
+    )
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="hop-batch", description="Solve many guard rosters on a worker pool"
+    )
+    parser.add_argument(
+        "source", type=Path, help="directory of *.txt inputs or a manifest file"
+    )
+    parser.add_argument(
+        "--out-dir", type=Path, default=Path("data") / "results" / "batch"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--days", type=int, default=112)
+    parser.add_argument(
+        "--max-iter",
+        type=int,
+        default=None,
+        help=f"default {DEFAULT_MAX_ITER} without --time-budget",
+    )
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--engine", choices=get_args(Engine), default="hill")
+    parser.add_argument("--init", choices=["greedy", "flow"], default="greedy")
+    args = parser.parse_args(argv)
+
+    sites = _collect_sites(args.source)
+    try:
+        _check_names(sites)
+        _check_outputs(sites, args.out_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    run_batch(
+        sites,
+        args.out_dir,
+        args.workers,
+        args.days,
+        args.max_iter,
+        args.seed,
+        args.engine,
+        args.time_budget,
+        args.init,
+    )
+
+
+if __name__ == "__main__":
+    main()
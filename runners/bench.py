@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from utils.bench_utils import run_benchmark
+
+if __name__ == "__main__":
+    guard_grid = [50, 200, 1000, 5000]
+    days_grid = [7, 112, 365, 1825]
+    max_iter = 10_000
+    seed = 5
+
+    work_dir = Path("data") / "bench"
+    fresults = Path("data") / "bench" / "results.json"
+
+    run_benchmark(guard_grid, days_grid, max_iter, seed, work_dir, fresults)
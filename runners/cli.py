@@ -0,0 +1,204 @@
+import argparse
+from pathlib import Path
+from typing import get_args
+
+from runners.run import run_optimization, run_replan
+from utils.move_utils import MOVE_KINDS
+from utils.replan_utils import REPLAN_ITER
+from utils.search_utils import DEFAULT_MAX_ITER, Engine
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(x) for x in value.split(",")]
+
+
+def _move_probs(value: str) -> dict[str, float]:
+    # "swap=0.6,replace=0.3,rotate=0.1"
+    moves: dict[str, float] = {}
+    for item in value.split(","):
+        kind, _, p = item.partition("=")
+        if kind not in MOVE_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown move type: {kind}")
+        moves[kind] = float(p) if p else 1.0
+    return moves
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="hop", description="Guard shift scheduling (HOP assignment 2, task 1)"
+    )
+    parser.add_argument(
+        "--input", type=Path, default=Path("data") / "input" / "input.txt"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("data") / "results" / "output.txt"
+    )
+    parser.add_argument("--days", type=int, default=112, help="planning horizon")
+    parser.add_argument(
+        "--max-iter",
+        type=int,
+        default=None,
+        help=f"default {DEFAULT_MAX_ITER} without --time-budget",
+    )
+    parser.add_argument(
+        "--time-budget", type=float, default=None, help="seconds for the optimizer"
+    )
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument(
+        "--engine",
+        choices=get_args(Engine),
+        default=None,
+        help="search engine (default hill); --chains always runs Metropolis",
+    )
+    parser.add_argument(
+        "--moves",
+        type=_move_probs,
+        default=None,
+        help="move type probabilities, e.g. swap=0.6,exchange=0.1,replace=0.2,"
+        "rotate=0.1 (hill, anneal, --chains)",
+    )
+    parser.add_argument("--init", choices=["greedy", "flow"], default="greedy")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python")
+    parser.add_argument(
+        "--starts", type=int, default=1, help="independent multi-start runs"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="process pool size for --starts / --chains / --block-weeks",
+    )
+    parser.add_argument(
+        "--chains", type=int, default=1, help="parallel tempering replicas"
+    )
+    parser.add_argument(
+        "--temps",
+        type=_float_list,
+        default=None,
+        help="comma-separated temperature ladder (implies --chains)",
+    )
+    parser.add_argument(
+        "--exchange-interval",
+        type=int,
+        default=500,
+        help="steps per chain between replica exchanges",
+    )
+    parser.add_argument(
+        "--block-weeks",
+        type=int,
+        default=None,
+        help="solve the horizon in blocks of N weeks in parallel, then stitch",
+    )
+    parser.add_argument(
+        "--stagnation", type=int, default=None, help="stop after N idle iterations"
+    )
+    parser.add_argument("--stop-at-bound", action="store_true")
+    parser.add_argument(
+        "--telemetry", default=None, help="JSON file name, next to --output"
+    )
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="also write a binary schedule (.bin) next to --output",
+    )
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--quiet", action="store_true", help="skip the results block")
+    parser.add_argument(
+        "--replan-from",
+        type=Path,
+        default=None,
+        help="previous output (.txt or .bin) to warm-start from "
+        "(needs --previous-input)",
+    )
+    parser.add_argument(
+        "--previous-input",
+        type=Path,
+        default=None,
+        help="input.txt the previous output was planned for",
+    )
+    parser.add_argument(
+        "--replan-iter",
+        type=int,
+        default=REPLAN_ITER,
+        help="local re-optimization budget for --replan-from",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if args.replan_from is not None:
+        if args.previous_input is None:
+            parser.error("--replan-from requires --previous-input")
+        try:
+            run_replan(
+                args.input.name,
+                args.output.name,
+                args.previous_input,
+                args.replan_from,
+                args.max_iter,
+                args.seed,
+                binary=args.binary,
+                replan_iter=args.replan_iter,
+                input_dir=args.input.parent,
+                output_dir=args.output.parent,
+                quiet=args.quiet,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    tempering = args.chains > 1 or args.temps is not None
+    if args.starts > 1 and tempering:
+        parser.error("--starts cannot be combined with --chains / --temps")
+    if tempering and (args.stagnation is not None or args.stop_at_bound):
+        parser.error("--stagnation / --stop-at-bound do not apply to --chains")
+    if tempering and args.engine is not None:
+        parser.error("--engine does not apply to --chains / --temps (Metropolis)")
+    if args.temps is not None and min(args.temps) <= 0:
+        parser.error("--temps must all be positive")
+    if args.exchange_interval < 1:
+        parser.error("--exchange-interval must be at least 1")
+    if args.moves is not None and args.engine in ("tabu", "lns"):
+        parser.error(f"--moves is not supported by --engine {args.engine}")
+    if args.block_weeks is not None:
+        if args.block_weeks < 1:
+            parser.error("--block-weeks must be at least 1")
+        if args.starts > 1 or args.chains > 1 or args.temps is not None:
+            parser.error("--block-weeks cannot be combined with --starts / --chains")
+        if args.init == "flow":
+            parser.error("--block-weeks builds its own initial blocks (greedy)")
+
+    run_optimization(
+        args.input.name,
+        args.output.name,
+        args.days,
+        args.max_iter,
+        args.seed,
+        backend=args.backend,
+        engine=args.engine or "hill",
+        time_budget=args.time_budget,
+        starts=args.starts,
+        workers=args.workers,
+        chains=args.chains,
+        temps=args.temps,
+        exchange_interval=args.exchange_interval,
+        block_weeks=args.block_weeks,
+        moves=args.moves,
+        init=args.init,
+        stagnation=args.stagnation,
+        stop_at_bound=args.stop_at_bound,
+        telemetry_file_name=args.telemetry,
+        binary=args.binary,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        input_dir=args.input.parent,
+        output_dir=args.output.parent,
+        quiet=args.quiet,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,273 @@
-import random as r
 from pathlib import Path
 from time import perf_counter
+from typing import Literal
 
 from utils.algo_utils import (
     get_quotas_and_days_sorted,
+    get_score_upper_bound,
     init_solution,
-    optimize_schedule,
-    repair_night_fairness,
+    repair_fairness,
 )
-from utils.data_utils import parse_input, save_output
+from utils.block_utils import get_blocks, init_blocks, solve_blocks
+from utils.data_utils import (
+    BINARY_SUFFIX,
+    get_input_hash,
+    load_schedule,
+    parse_input,
+    save_binary,
+    save_output,
+)
+from utils.flow_utils import init_solution_flow
+from utils.guard_utils import GuardTable
 from utils.helpers import (
     _get_coverage_score,
     _get_fairness_penalty,
     _get_pref_score,
+    _get_zone_masks,
     _is_schedule_valid,
 )
-from utils.print_utils import print_result
+from utils.move_utils import MoveKind
+from utils.numpy_utils import (
+    Backend,
+    _get_guard_arrays,
+    _np_fairness_penalty_and_min_max,
+    _np_get_coverage_score,
+    _np_get_pref_score,
+    _np_is_schedule_valid,
+    _to_array,
+)
+from utils.parallel_utils import multi_start, parallel_tempering
+from utils.print_utils import (
+    print_block_stats,
+    print_replan_stats,
+    print_result,
+    print_start_stats,
+    print_tempering_stats,
+)
+from utils.replan_utils import REPLAN_ITER, replan_schedule
+from utils.search_utils import Engine, run_engine
+from utils.seed_utils import derive_seed, get_rng_record, get_stream_name, spawn_rng
+from utils.telemetry_utils import (
+    finish_search_telemetry,
+    new_telemetry,
+    phase,
+    profile_hooks,
+    save_telemetry,
+)
+
+
+def _get_scores(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int],
+    guard_arrays: tuple | None,
+) -> tuple[bool, float, float, int]:
+    if guard_arrays is None:
+        valid = _is_schedule_valid(shifts, guards)
+        pref_score = _get_pref_score(shifts, guards)
+        cov_score = _get_coverage_score(shifts, guards, zone_masks)
+        penalty = _get_fairness_penalty(shifts, guards)
+        return valid, pref_score, cov_score, penalty
+
+    prefs, forbiddens, zones = guard_arrays
+    shifts_arr = _to_array(shifts)
+    valid = _np_is_schedule_valid(shifts_arr, forbiddens)
+    pref_score = _np_get_pref_score(shifts_arr, prefs)
+    cov_score = _np_get_coverage_score(shifts_arr, zones)
+    penalty, _, _ = _np_fairness_penalty_and_min_max(shifts_arr, len(guards))
+    return valid, pref_score, cov_score, penalty
 
 
 def run_optimization(
-    input_file_name: str, output_file_name: str, days: int, max_iter: int, seed: int
-) -> None:
+    input_file_name: str,
+    output_file_name: str,
+    days: int,
+    max_iter: int | None,
+    seed: int,
+    backend: Backend = "python",
+    engine: Engine = "hill",
+    time_budget: float | None = None,
+    starts: int = 1,
+    workers: int | None = None,
+    chains: int = 1,
+    temps: list[float] | None = None,
+    exchange_interval: int = 500,
+    block_weeks: int | None = None,
+    moves: dict[MoveKind, float] | None = None,
+    init: Literal["greedy", "flow"] = "greedy",
+    stagnation: int | None = None,
+    stop_at_bound: bool = False,
+    telemetry_file_name: str | None = None,
+    binary: bool = False,
+    profile: bool = False,
+    trace_memory: bool = False,
+    input_dir: Path = Path("data") / "input",
+    output_dir: Path = Path("data") / "results",
+    quiet: bool = False,
+) -> dict:
     t1 = perf_counter()
+    telemetry = new_telemetry()
 
     # parameters
-    fin = Path("data") / "input" / input_file_name
-    fout = Path("data") / "results" / output_file_name
-    rng = r.Random(seed)
+    fin = input_dir / input_file_name
+    fout = output_dir / output_file_name
+    # construction and repair draw no random numbers, every search mode
+    # below replaces "search" with its own streams
+    rng = spawn_rng(seed, "search")
+    search_streams = {get_stream_name("search"): derive_seed(seed, "search")}
 
     # preparation
-    guards = parse_input(fin)
-    quotas, available = get_quotas_and_days_sorted(guards, days)
-    shifts_1 = init_solution(guards, available, quotas)
+    with phase(telemetry, "parse"):
+        guards = parse_input(fin)
+    with phase(telemetry, "quota"):
+        quotas, available = get_quotas_and_days_sorted(guards, days)
+        zone_masks = _get_zone_masks(guards)
+        guard_arrays = _get_guard_arrays(guards) if backend == "numpy" else None
+    with phase(telemetry, "construction"):
+        if block_weeks is not None:
+            blocks = get_blocks(days, block_weeks)
+            shifts_1 = init_blocks(guards, blocks, days)
+        else:
+            shifts_1 = init_solution_flow(guards, days) if init == "flow" else None
+            if shifts_1 is None:
+                shifts_1 = init_solution(guards, available, quotas)
 
     # initial score
-    pref_score_1 = _get_pref_score(shifts_1, guards)
-    cov_score_1 = _get_coverage_score(shifts_1, guards)
-    penalty_1 = _get_fairness_penalty(shifts_1, guards)
+    _, pref_score_1, cov_score_1, penalty_1 = _get_scores(
+        shifts_1, guards, zone_masks, guard_arrays
+    )
 
     # optimization
-    shifts_2 = optimize_schedule(shifts_1, guards, rng, max_iter)
-    shifts_2 = repair_night_fairness(shifts_2, guards)
-    assert _is_schedule_valid(shifts_2, guards)
+    upper_bound = None
+    if stop_at_bound:
+        upper_bound = get_score_upper_bound(guards, days, zone_masks)
+
+    stats: dict = {}
+    start_stats: list[dict] = []
+    block_stats: list[dict] = []
+    repair_stats: dict = {}
+    with phase(telemetry, "optimization"), profile_hooks(
+        telemetry, profile, trace_memory
+    ):
+        if chains > 1 or temps is not None:
+            # plus "chain/<i>/<round>" streams, see `parallel_tempering`
+            search_streams = {
+                get_stream_name("exchange"): derive_seed(seed, "exchange")
+            }
+            shifts_2 = parallel_tempering(
+                guards,
+                days,
+                shifts_1,
+                seed,
+                max_iter,
+                chains,
+                temps,
+                exchange_interval,
+                workers,
+                time_budget,
+                stats,
+                moves,
+            )
+        elif starts > 1:
+            seeds = [derive_seed(seed, "start", i) for i in range(starts)]
+            search_streams = {
+                get_stream_name("start", i): s for i, s in enumerate(seeds)
+            }
+            shifts_2, start_stats = multi_start(
+                guards,
+                days,
+                seeds,
+                max_iter,
+                workers,
+                engine,
+                time_budget,
+                shifts_1,
+                stagnation,
+                upper_bound,
+                moves,
+                stats,
+            )
+        elif block_weeks is not None:
+            search_streams = {
+                get_stream_name("block", i): derive_seed(seed, "block", i)
+                for i in range(len(blocks))
+            }
+            search_streams[get_stream_name("stitch")] = derive_seed(seed, "stitch")
+            shifts_2, block_stats = solve_blocks(
+                guards,
+                shifts_1,
+                blocks,
+                seed,
+                max_iter,
+                workers,
+                engine,
+                time_budget,
+                stagnation,
+                stats,
+                moves,
+                upper_bound,
+            )
+        else:
+            shifts_2 = run_engine(
+                shifts_1,
+                guards,
+                rng,
+                engine,
+                max_iter,
+                time_budget,
+                zone_masks,
+                stats,
+                stagnation,
+                upper_bound,
+                moves,
+            )
+    if starts == 1:
+        with phase(telemetry, "repair"):
+            shifts_2 = repair_fairness(shifts_2, guards, zone_masks, repair_stats)
 
     # final score
-    pref_score_2 = _get_pref_score(shifts_2, guards)
-    cov_score_2 = _get_coverage_score(shifts_2, guards)
-    penalty_2 = _get_fairness_penalty(shifts_2, guards)
+    valid, pref_score_2, cov_score_2, penalty_2 = _get_scores(
+        shifts_2, guards, zone_masks, guard_arrays
+    )
+    assert valid
 
-    # save results to ./data/results/
-    save_output(fout, shifts_2)
+    # save results to ./data/results/ (or `output_dir`)
+    with phase(telemetry, "save"):
+        save_output(fout, shifts_2)
+        if binary:
+            save_binary(
+                fout.with_suffix(BINARY_SUFFIX),
+                shifts_2,
+                len(guards),
+                pref_score_2,
+                cov_score_2,
+                penalty_2,
+                get_input_hash(fin),
+            )
 
     t2 = perf_counter()
     t_d = t2 - t1
 
+    # telemetry
+    finish_search_telemetry(telemetry, stats)
+    telemetry["starts"] = start_stats
+    telemetry["blocks"] = block_stats
+    telemetry["repair"] = repair_stats
+    telemetry["rng"] = get_rng_record(
+        seed, {"construction": None, "search": search_streams, "repair": None}
+    )
+    telemetry["total"] = t_d
+    telemetry["scores"] = {
+        "pref": [pref_score_1, pref_score_2],
+        "cov": [cov_score_1, cov_score_2],
+        "penalty": [penalty_1, penalty_2],
+    }
+    if telemetry_file_name is not None:
+        save_telemetry(output_dir / telemetry_file_name, telemetry)
+
+    if quiet:
+        return telemetry
+
     # results
     print_result(
         guards,
@@ -66,6 +280,123 @@ def run_optimization(
         cov_score_2,
         penalty_1,
         penalty_2,
+        backend=backend,
     )
+    if start_stats:
+        print_start_stats(start_stats)
+    if block_stats:
+        print_block_stats(block_stats)
+    if "exchange_attempts" in stats:
+        print_tempering_stats(stats)
 
     # print(_is_schedule_valid(shifts_2, guards))
+    return telemetry
+
+
+def run_replan(
+    input_file_name: str,
+    output_file_name: str,
+    previous_input: Path,
+    previous_output: Path,
+    max_iter: int | None,
+    seed: int,
+    binary: bool = False,
+    replan_iter: int = REPLAN_ITER,
+    input_dir: Path = Path("data") / "input",
+    output_dir: Path = Path("data") / "results",
+    quiet: bool = False,
+) -> dict:
+    # `replan_iter` bounds the local re-optimization, `max_iter` the full
+    # optimization when the previous roster cannot be reused
+    t1 = perf_counter()
+
+    # parameters
+    fin = input_dir / input_file_name
+    fout = output_dir / output_file_name
+    rng = spawn_rng(seed, "replan")
+
+    # preparation
+    guards_old = parse_input(previous_input)
+    guards = parse_input(fin)
+    shifts_1 = load_schedule(previous_output, previous_input)
+    zone_masks = _get_zone_masks(guards)
+
+    # re-planning
+    stats: dict = {}
+    shifts_2 = replan_schedule(
+        shifts_1, guards_old, guards, rng, replan_iter, zone_masks, stats
+    )
+    if shifts_2 is None:
+        # guard count changed, warm start is not possible
+        return run_optimization(
+            input_file_name,
+            output_file_name,
+            len(shifts_1),
+            max_iter,
+            seed,
+            binary=binary,
+            input_dir=input_dir,
+            output_dir=output_dir,
+            quiet=quiet,
+        )
+    if stats["unrepaired"]:
+        # a slot without any allowed replacement means fewer than three guards
+        # may serve on that weekday, a plan from scratch cannot exist either
+        raise ValueError(
+            f"{fin}: {stats['unrepaired']} slots have no allowed guard left, "
+            "the input is infeasible"
+        )
+
+    # scores (the previous schedule is scored against the new input)
+    _, pref_score_1, cov_score_1, penalty_1 = _get_scores(
+        shifts_1, guards, zone_masks, None
+    )
+    valid, pref_score_2, cov_score_2, penalty_2 = _get_scores(
+        shifts_2, guards, zone_masks, None
+    )
+    assert valid
+
+    save_output(fout, shifts_2)
+    if binary:
+        save_binary(
+            fout.with_suffix(BINARY_SUFFIX),
+            shifts_2,
+            len(guards),
+            pref_score_2,
+            cov_score_2,
+            penalty_2,
+            get_input_hash(fin),
+        )
+
+    t2 = perf_counter()
+    t_d = t2 - t1
+
+    telemetry = {
+        "replan": stats,
+        "rng": get_rng_record(
+            seed, {"replan": {get_stream_name("replan"): derive_seed(seed, "replan")}}
+        ),
+        "total": t_d,
+        "scores": {
+            "pref": [pref_score_1, pref_score_2],
+            "cov": [cov_score_1, cov_score_2],
+            "penalty": [penalty_1, penalty_2],
+        },
+    }
+    if quiet:
+        return telemetry
+
+    print_result(
+        guards,
+        shifts_1,
+        shifts_2,
+        t_d,
+        pref_score_1,
+        pref_score_2,
+        cov_score_1,
+        cov_score_2,
+        penalty_1,
+        penalty_2,
+    )
+    print_replan_stats(stats)
+    return telemetry
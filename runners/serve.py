@@ -0,0 +1,535 @@
+import argparse
+import asyncio
+import hashlib
+import ipaddress
+import json
+import multiprocessing as mp
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.queues import Queue
+from pathlib import Path
+from time import perf_counter
+from typing import get_args
+
+from utils.algo_utils import get_quotas_and_days_sorted, init_solution, repair_fairness
+from utils.data_utils import (
+    BINARY_SUFFIX,
+    load_schedule,
+    parse_guards,
+    parse_input,
+    save_binary,
+    save_output,
+)
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _get_coverage_score,
+    _get_fairness_penalty,
+    _get_pref_score,
+    _get_zone_masks,
+)
+from utils.move_utils import MOVE_KINDS
+from utils.replan_utils import REPLAN_ITER, replan_schedule
+from utils.search_utils import Engine, run_engine
+from utils.seed_utils import spawn_rng
+
+DEFAULT_SOCKET = Path("data") / "hop.sock"
+DEFAULT_RESULTS_DIR = Path("data") / "results"
+# one progress event per job and interval, in seconds
+PROGRESS_EVERY = 0.25
+ENGINES = get_args(Engine)
+# parsed instances kept per service and per worker, least recently used go first
+DEFAULT_CACHE_SIZE = 32
+
+# per-process state: the progress queue and precomputed tables per instance
+_worker_state: dict = {}
+
+
+def _init_worker(progress: Queue, cache_size: int) -> None:
+    _worker_state["progress"] = progress
+    _worker_state["instances"] = OrderedDict()
+    _worker_state["cache_size"] = cache_size
+
+
+def _cache_get[K, V](cache: OrderedDict[K, V], key: K) -> V | None:
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put[K, V](cache: OrderedDict[K, V], key: K, value: V, size: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _get_tables(key: str, guards: GuardTable, days: int | None = None) -> dict:
+    # zones once per instance, quotas and the difficulty order once per horizon
+    instances = _worker_state["instances"]
+    instance = _cache_get(instances, key)
+    if instance is None:
+        instance = {"zone_masks": _get_zone_masks(guards)}
+        _cache_put(instances, key, instance, _worker_state["cache_size"])
+    if days is not None and days not in instance:
+        instance[days] = get_quotas_and_days_sorted(guards, days)
+    return instance
+
+
+def _report(job: int, event: dict | None) -> None:
+    # `None` ends the job's event stream
+    _worker_state["progress"].put((job, event))
+
+
+def _heartbeat(job: int, t1: float, best: dict, done: threading.Event) -> None:
+    # runs beside the search, so every engine reports even while not improving
+    while not done.wait(PROGRESS_EVERY):
+        _report(job, {"event": "progress", **best, "elapsed": perf_counter() - t1})
+
+
+def _end_lost_stream(future: asyncio.Future, events: asyncio.Queue) -> None:
+    # a cancelled job or a dead worker never ends its event stream itself
+    if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+        events.put_nowait(None)
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _get_output(results_dir: Path, output: str | None) -> Path | None:
+    # requests may only write below the results directory
+    if output is None:
+        return None
+    root = results_dir.resolve()
+    fout = (root / output).resolve()
+    try:
+        fout.relative_to(root)
+    except ValueError:
+        raise ValueError(f"output must stay inside {results_dir}") from None
+    return fout
+
+
+def _get_result(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int],
+    stats: dict,
+    t1: float,
+    fout: Path | None,
+    binary: bool,
+    input_hash: bytes,
+) -> dict:
+    pref = _get_pref_score(shifts, guards)
+    cov = _get_coverage_score(shifts, guards, zone_masks)
+    penalty = _get_fairness_penalty(shifts, guards)
+    if fout is not None:
+        save_output(fout, shifts)
+        if binary:
+            save_binary(
+                fout.with_suffix(BINARY_SUFFIX),
+                shifts,
+                len(guards),
+                pref,
+                cov,
+                penalty,
+                input_hash,
+            )
+    stats.pop("trajectory", None)
+    return {
+        "pref": pref,
+        "cov": cov,
+        "penalty": penalty,
+        "time": perf_counter() - t1,
+        "stats": stats,
+        "shifts": [[g + 1 for g in s] for s in shifts],
+    }
+
+
+def _solve(
+    job: int, key: str, guards: GuardTable, request: dict, fout: Path | None
+) -> dict:
+    t1 = perf_counter()
+    try:
+        _report(job, {"event": "started", "pid": os.getpid()})
+
+        days = request.get("days", 112)
+        instance = _get_tables(key, guards, days)
+        zone_masks = instance["zone_masks"]
+        quotas, available = instance[days]
+        shifts = init_solution(guards, available, quotas)
+
+        # best-so-far scores, re-scored at most once per progress interval
+        best = {
+            "pref": _get_pref_score(shifts, guards),
+            "cov": _get_coverage_score(shifts, guards, zone_masks),
+        }
+        last = t1
+
+        def on_improve(shifts: list[list[int]]) -> None:
+            nonlocal last
+            now = perf_counter()
+            if now - last < PROGRESS_EVERY:
+                return
+            last = now
+            best["pref"] = _get_pref_score(shifts, guards)
+            best["cov"] = _get_coverage_score(shifts, guards, zone_masks)
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=_heartbeat, args=(job, t1, best, done), daemon=True
+        )
+        heartbeat.start()
+        stats: dict = {}
+        try:
+            shifts = run_engine(
+                shifts,
+                guards,
+                spawn_rng(request.get("seed", 5), "search"),
+                request.get("engine", "hill"),
+                request.get("max_iter"),
+                request.get("time_budget"),
+                zone_masks,
+                stats,
+                request.get("stagnation"),
+                None,
+                request.get("moves"),
+                on_improve,
+            )
+        finally:
+            done.set()
+            heartbeat.join()
+        shifts = repair_fairness(shifts, guards, zone_masks)
+
+        return _get_result(
+            shifts,
+            guards,
+            zone_masks,
+            stats,
+            t1,
+            fout,
+            request.get("binary", False),
+            bytes.fromhex(key),
+        )
+    finally:
+        _report(job, None)
+
+
+def _replan(
+    job: int,
+    key: str,
+    guards: GuardTable,
+    guards_old: GuardTable,
+    shifts_old: list[list[int]],
+    request: dict,
+    fout: Path | None,
+) -> dict:
+    t1 = perf_counter()
+    try:
+        _report(job, {"event": "started", "pid": os.getpid()})
+
+        zone_masks = _get_tables(key, guards)["zone_masks"]
+        stats: dict = {}
+        shifts = replan_schedule(
+            shifts_old,
+            guards_old,
+            guards,
+            spawn_rng(request.get("seed", 5), "replan"),
+            request.get("max_iter", REPLAN_ITER),
+            zone_masks,
+            stats,
+        )
+        if shifts is None:
+            raise ValueError("guard count changed, send a solve request instead")
+        if stats["unrepaired"]:
+            raise ValueError(
+                f"{stats['unrepaired']} slots have no allowed guard left, "
+                "the input is infeasible"
+            )
+
+        return _get_result(
+            shifts,
+            guards,
+            zone_masks,
+            stats,
+            t1,
+            fout,
+            request.get("binary", False),
+            bytes.fromhex(key),
+        )
+    finally:
+        _report(job, None)
+
+
+class Service:
+    # the last `cache_size` parsed instances stay in memory, keyed by the hash
+    # of their input text; file inputs are re-read only when their mtime changes
+    def __init__(
+        self,
+        workers: int | None = None,
+        results_dir: Path = DEFAULT_RESULTS_DIR,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        # spawned workers: the progress forwarder thread is already running
+        ctx = mp.get_context("spawn")
+        self.progress: Queue = ctx.Queue()
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.progress, cache_size),
+        )
+        self.instances: OrderedDict[str, GuardTable] = OrderedDict()
+        self.files: OrderedDict[Path, tuple[int, str]] = OrderedDict()
+        self.cache_size = cache_size
+        self.jobs: dict[int, asyncio.Queue] = {}
+        self.writers: set[asyncio.StreamWriter] = set()
+        self.next_job = 0
+        self.results_dir = results_dir
+
+    async def get_instance(
+        self, source: str | None, text: str | None
+    ) -> tuple[str, GuardTable]:
+        # the table is returned too, another request may evict it meanwhile
+        if text is not None:
+            key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+            guards = _cache_get(self.instances, key)
+            if guards is None:
+                guards = parse_guards(text.splitlines())
+                _cache_put(self.instances, key, guards, self.cache_size)
+            return key, guards
+        if source is None:
+            raise ValueError("request needs `input` (path) or `text`")
+
+        fin = Path(source).resolve()
+        mtime = fin.stat().st_mtime_ns
+        cached = _cache_get(self.files, fin)
+        if cached is not None and cached[0] == mtime:
+            guards = _cache_get(self.instances, cached[1])
+            if guards is not None:
+                return cached[1], guards
+        data = await asyncio.to_thread(fin.read_bytes)
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        guards = _cache_get(self.instances, key)
+        if guards is None:
+            guards = await asyncio.to_thread(parse_input, fin)
+            _cache_put(self.instances, key, guards, self.cache_size)
+        _cache_put(self.files, fin, (mtime, key), self.cache_size)
+        return key, guards
+
+    async def forward_progress(self) -> None:
+        # the queue is fed by the worker processes, read it off the loop
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self.progress.get)
+            if item is None:
+                return
+            job, event = item
+            events = self.jobs.get(job)
+            if events is not None:
+                events.put_nowait(event)
+
+    async def run_job(
+        self, request: dict, send: Callable[[dict], Awaitable[None]]
+    ) -> None:
+        op = request.get("op")
+        if op == "load":
+            key, guards = await self.get_instance(
+                request.get("input"), request.get("text")
+            )
+            await send({"event": "loaded", "key": key, "guards": len(guards)})
+            return
+        if op not in ("solve", "replan"):
+            raise ValueError(f"unknown op: {op}")
+        if request.get("engine", "hill") not in ENGINES:
+            raise ValueError(f"unknown engine: {request['engine']}")
+        for kind in request.get("moves") or {}:
+            if kind not in MOVE_KINDS:
+                raise ValueError(f"unknown move type: {kind}")
+
+        fout = _get_output(self.results_dir, request.get("output"))
+        key, guards = await self.get_instance(request.get("input"), request.get("text"))
+        if op == "replan":
+            previous_input = request.get("previous_input")
+            _, guards_old = await self.get_instance(
+                previous_input, request.get("previous_text")
+            )
+            if "shifts" in request:
+                shifts_old = [[g - 1 for g in s] for s in request["shifts"]]
+            else:
+                shifts_old = await asyncio.to_thread(
+                    load_schedule,
+                    Path(request["previous_output"]),
+                    Path(previous_input) if previous_input is not None else None,
+                )
+
+        job = self.next_job
+        self.next_job += 1
+        events: asyncio.Queue = asyncio.Queue()
+        self.jobs[job] = events
+
+        loop = asyncio.get_running_loop()
+        if op == "solve":
+            future = loop.run_in_executor(
+                self.pool, _solve, job, key, guards, request, fout
+            )
+        else:
+            future = loop.run_in_executor(
+                self.pool,
+                _replan,
+                job,
+                key,
+                guards,
+                guards_old,
+                shifts_old,
+                request,
+                fout,
+            )
+        future.add_done_callback(lambda f: _end_lost_stream(f, events))
+        await send({"event": "queued", "job": job, "key": key})
+
+        # stream worker events until the worker ends the stream
+        try:
+            while (event := await events.get()) is not None:
+                await send(event)
+        finally:
+            del self.jobs[job]
+        await send({"event": "result", **await future})
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # one JSON request per line; replies are JSON lines tagged with the
+        # request `id`, requests of one connection run concurrently
+        tasks: set[asyncio.Task] = set()
+        self.writers.add(writer)
+
+        async def handle_request(line: bytes) -> None:
+            request_id = None
+
+            async def send(message: dict) -> None:
+                message = {"id": request_id, **message}
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                await self.run_job(request, send)
+            except Exception as e:
+                await send({"event": "error", "error": str(e)})
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(handle_request(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+        self.progress.put(None)
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(
+    socket: Path | None,
+    host: str | None,
+    port: int,
+    workers: int | None,
+    preload: list[Path],
+    results_dir: Path = DEFAULT_RESULTS_DIR,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+) -> None:
+    service = Service(workers, results_dir, cache_size)
+    forwarder = asyncio.create_task(service.forward_progress())
+    try:
+        for fin in preload:
+            await service.get_instance(str(fin), None)
+        if host is not None:
+            server = await asyncio.start_server(service.handle_client, host, port)
+            where = f"{host}:{port}"
+        else:
+            socket.unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(service.handle_client, socket)
+            # requests name files on this machine, only the owner may connect
+            socket.chmod(0o600)
+            where = str(socket)
+        print(f" • hop-serve listening on {where} ({len(preload)} preloaded)")
+        # runs until cancelled (Ctrl+C); not `serve_forever`, which would wait
+        # for the connected clients to hang up first
+        try:
+            await asyncio.Future()
+        finally:
+            server.close()
+    finally:
+        service.close()
+        await forwarder
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="hop-serve",
+        description="Serve solve / re-plan requests with hot instances",
+    )
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET)
+    parser.add_argument(
+        "--host", default=None, help="listen on TCP (loopback only) instead of --socket"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--preload", type=Path, nargs="*", default=[], help="inputs to parse upfront"
+    )
+    parser.add_argument(
+        "--results-dir",
+        type=Path,
+        default=DEFAULT_RESULTS_DIR,
+        help="`output` paths of requests are relative to it",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="parsed instances kept in memory",
+    )
+    args = parser.parse_args(argv)
+    if args.cache_size < 1:
+        parser.error("--cache-size must be at least 1")
+    if args.host is not None and not _is_loopback(args.host):
+        parser.error("--host must be a loopback address, requests name local files")
+
+    try:
+        asyncio.run(
+            serve(
+                args.socket,
+                args.host,
+                args.port,
+                args.workers,
+                args.preload,
+                args.results_dir,
+                args.cache_size,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
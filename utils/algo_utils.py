@@ -1,23 +1,35 @@
 import random as r
-from copy import deepcopy
+from time import perf_counter
+from typing import Callable, Literal
 
+from utils.guard_utils import GuardTable
 from utils.helpers import (
     _day_of_the_week,
     _days_sorted_by_difficulty,
     _dayshift,
-    _get_coverage_score,
-    _get_fairness_penalty,
-    _get_night_count,
-    _get_pref_score,
+    _get_coverage_upper_bound,
+    _get_days_score,
+    _get_pref_upper_bound,
     _get_quota,
-    _is_new_schedule_better,
+    _get_slot_positions,
+    _get_swap_list,
+    _get_total_shift_count,
+    _get_weekday_index,
+    _get_zone_masks,
+    _is_delta_better,
+    _is_replacement_safe,
     _nightshift,
-    _swap,
 )
+from utils.move_utils import MoveKind, Neighbourhood
+from utils.schedule_utils import Schedule
+
+CLOCK_CHECK_EVERY = 256
+DAY_SLOTS = (0,)
+NIGHT_SLOTS = (1, 2)
 
 
 def get_quotas_and_days_sorted(
-    guards: dict[int, dict[str, set[int]]], days: int
+    guards: GuardTable, days: int
 ) -> tuple[dict[str, int], list[tuple[int, int, int]]]:
     quotas = _get_quota(guards, days)
     available = _days_sorted_by_difficulty(guards, days)
@@ -25,12 +37,34 @@ def get_quotas_and_days_sorted(
     return quotas, available
 
 
+def get_score_upper_bound(
+    guards: GuardTable,
+    days: int,
+    zone_masks: list[int] | None = None,
+) -> tuple[int, int]:
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
+    pref_bound = _get_pref_upper_bound(guards, days)
+    cov_bound = _get_coverage_upper_bound(guards, days, zone_masks)
+
+    return pref_bound, cov_bound
+
+
+def _is_at_bound(pref: int, cov: int, upper_bound: tuple[int, int]) -> bool:
+    # both raw scores have to reach their own bound, only then nothing is left
+    # to gain lexicographically
+    return pref >= upper_bound[0] and cov >= upper_bound[1]
+
+
 def init_solution(
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
     available: list[tuple[int, int, int]],
     quotas: dict[str, int],
+    targets: tuple[list[int], list[int]] | None = None,
 ) -> list[list[int]]:
+    # `targets` – per-guard day and night quotas instead of the shared ones
     V = len(guards)
+    day_quota, night_quota = targets if targets is not None else (None, None)
 
     day_count = [0] * V
     night_count = [0] * V
@@ -50,6 +84,7 @@ def init_solution(
         shifts,
         extra_day_used,
         unavailable_day_guards,
+        day_quota,
     )
 
     # nightshift 1
@@ -63,6 +98,7 @@ def init_solution(
         extra_night_used,
         unavailable_night_guards,
         nightshift_num=1,
+        night_quota=night_quota,
     )
 
     # nightshift 2
@@ -76,6 +112,7 @@ def init_solution(
         extra_night_used,
         unavailable_night_guards,
         nightshift_num=2,
+        night_quota=night_quota,
     )
 
     # print(f"day_count: {day_count}\n")
@@ -89,82 +126,211 @@ def init_solution(
 
 def optimize_schedule(
     shifts: list[list[int]],
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
     rng: r.Random,
-    max_iter: int,
+    max_iter: int | None,
+    zone_masks: list[int] | None = None,
+    cov_memo: dict[tuple[int, ...], int] | None = None,
+    sampler: Literal["uniform", "feasible"] = "feasible",
+    stats: dict | None = None,
+    stagnation: int | None = None,
+    time_budget: float | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    on_improve: Callable[[list[list[int]]], None] | None = None,
+    moves: dict[MoveKind, float] | None = None,
 ) -> list[list[int]]:
-    shifts_1 = deepcopy(shifts)
-    pref_score_1 = _get_pref_score(shifts_1, guards)
-    cov_score_1 = _get_coverage_score(shifts_1, guards)
-    penalty_1 = _get_fairness_penalty(shifts_1, guards)
-
-    for _ in range(max_iter):
-        shifts_2 = _swap(shifts_1, rng)
-        better, pref2, cov2, pen2 = _is_new_schedule_better(
-            guards, rng, shifts_2, pref_score_1, cov_score_1, penalty_1
+    schedule = Schedule(shifts)
+    days = len(schedule)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
+    weekday_index = _get_weekday_index(guards, days)
+    neighbourhood = Neighbourhood(
+        schedule, guards, zone_masks, weekday_index, moves, cov_memo
+    )
+
+    # raw scores relative to the start, absolute only with `upper_bound`
+    cur_pref, cur_cov = 0, 0
+    if upper_bound is not None:
+        cur_pref, cur_cov = _get_days_score(
+            schedule.shifts, guards, zone_masks, range(days)
         )
+
+    iterations = 0
+    invalid = 0
+    worse = 0
+    tie = 0
+    accepted = 0
+    improved = 0
+    resampled = 0
+    since_improved = 0
+    stop_reason = "max_iter"
+    trajectory: list[tuple[int, float, int, int]] = []
+    t_begin = perf_counter()
+
+    while max_iter is None or iterations < max_iter:
+        if time_budget is not None and iterations % CLOCK_CHECK_EVERY == 0:
+            if perf_counter() - t_begin >= time_budget:
+                stop_reason = "deadline"
+                break
+        if stagnation is not None and since_improved >= stagnation:
+            stop_reason = "stagnation"
+            break
+        if upper_bound is not None and _is_at_bound(cur_pref, cur_cov, upper_bound):
+            stop_reason = "bound"
+            break
+        iterations += 1
+        since_improved += 1
+
+        if sampler == "feasible":
+            move, tries = neighbourhood.sample(rng)
+            resampled += tries
+            if move is None:
+                continue
+        else:
+            move = ("swap", _get_swap_list(days, rng))
+
+        valid, d_pref, d_cov, d_pen = neighbourhood.delta(move)
+        delta = (d_pref, d_cov, -d_pen)
+        if not valid:
+            invalid += 1
+        elif delta < (0, 0, 0):
+            worse += 1
+        elif delta == (0, 0, 0):
+            tie += 1
+
+        better = _is_delta_better(rng, valid, d_pref, d_cov, d_pen)
         if better:
-            shifts_1 = shifts_2
-            pref_score_1 = pref2
-            cov_score_1 = cov2
-            penalty_1 = pen2
+            neighbourhood.apply(move)
+            accepted += 1
+            cur_pref += d_pref
+            cur_cov += d_cov
+
+            # ties are accepted too, only strict improvements reset stagnation
+            if delta > (0, 0, 0):
+                improved += 1
+                since_improved = 0
+                if stats is not None:
+                    elapsed = perf_counter() - t_begin
+                    trajectory.append((iterations, elapsed, cur_pref, cur_cov))
+                if on_improve is not None:
+                    on_improve(schedule.shifts)
+
+    if stats is not None:
+        stats["iterations"] = stats.get("iterations", 0) + iterations
+        stats["invalid"] = stats.get("invalid", 0) + invalid
+        stats["worse"] = stats.get("worse", 0) + worse
+        stats["tie"] = stats.get("tie", 0) + tie
+        stats["accepted"] = stats.get("accepted", 0) + accepted
+        stats["improved"] = stats.get("improved", 0) + improved
+        stats["resampled"] = stats.get("resampled", 0) + resampled
+        stats["stop_reason"] = stop_reason
+        stats["trajectory"] = stats.get("trajectory", []) + trajectory
 
-    return shifts_1
+    return schedule.shifts
 
 
-def repair_night_fairness(
+def _rebalance_slots(
     shifts: list[list[int]],
-    guards: dict[int, dict[str, set[int]]],
-) -> list[list[int]]:
+    guards: GuardTable,
+    zone_masks: list[int],
+    positions: list[list[tuple[int, int]]],
+    counts: list[int],
+    total_count: list[int],
+    balance_total: bool,
+) -> int:
+    # hand shifts of one kind (`positions`/`counts`) from loaded to light
+    # guards; by kind count (gap >= 2), or by total count while the kind
+    # counts just trade places (gap >= 1) – every move lowers a sum of squares
     V = len(guards)
-    days = len(shifts)
-    q_n = (2 * days) // V  # floor ночных смен на человека
+    forbiddens = guards.forbiddens
+    values = total_count if balance_total else counts
+    kind_gap = 1 if balance_total else 2
+    moves = 0
 
-    shifts_new = deepcopy(shifts)
-    night_count = _get_night_count(shifts_new, V)
+    improved = True
+    while improved:
+        improved = False
+        lo = min(values)
+        hi = max(values)
+        if hi - lo < 2:
+            break
 
-    deficit = sum(1 for x in night_count if x < q_n)
-    surplus = sum(1 for x in night_count if x > q_n)
-    max_passes = min(deficit, surplus)
+        highs = [g for g in range(V) if values[g] >= lo + 2]
+        highs.sort(key=lambda g: (-values[g], g))
+        lows = [g for g in range(V) if values[g] <= hi - 2]
+        lows.sort(key=lambda g: (values[g], g))
+        lows_by_weekday = {
+            d: [g for g in lows if not forbiddens[g] >> (d - 1) & 1]
+            for d in range(1, 8)
+        }
 
-    for _ in range(max_passes):
-        low_guards = {g for g in range(V) if night_count[g] < q_n}
-        high_guards = {g for g in range(V) if night_count[g] > q_n}
+        for g_high in highs:
+            for idx_d, slot in list(positions[g_high]):
+                s = shifts[idx_d]
+                weekday = _day_of_the_week(idx_d + 1)
+                for g_low in lows_by_weekday[weekday]:
+                    if values[g_high] - values[g_low] < 2:
+                        continue
+                    if counts[g_high] - counts[g_low] < kind_gap:
+                        continue
+                    if not _is_replacement_safe(
+                        s, weekday, guards, zone_masks, slot, g_low
+                    ):
+                        continue
 
-        if not low_guards or not high_guards:
-            break
+                    s[slot] = g_low
+                    positions[g_high].remove((idx_d, slot))
+                    positions[g_low].append((idx_d, slot))
+                    counts[g_high] -= 1
+                    counts[g_low] += 1
+                    total_count[g_high] -= 1
+                    total_count[g_low] += 1
+                    moves += 1
+                    improved = True
+                    break
 
-        improved = False
+    return moves
 
-        for g_low in low_guards:
-            idx_g_low = g_low + 1
-            forbiddens = guards[idx_g_low]["forbiddens"]
-            for idx_d, s in enumerate(shifts_new):
-                if g_low in s:
-                    continue
 
-                d = idx_d + 1
-                weekday = _day_of_the_week(d)
-                if weekday in forbiddens:
-                    continue
+def repair_fairness(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int] | None = None,
+    stats: dict | None = None,
+) -> list[list[int]]:
+    V = len(guards)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
 
-                for slot in (1, 2):
-                    g_high = shifts_new[idx_d][slot]
+    shifts_new = [s.copy() for s in shifts]
+    total_count = _get_total_shift_count(shifts_new, guards)
+    kinds = {"night": NIGHT_SLOTS, "day": DAY_SLOTS}
 
-                    if g_high not in high_guards:
-                        continue
+    # night and day counts within 1 of each other (q and q + 1) ...
+    moves = {}
+    for kind, slots in kinds.items():
+        positions = _get_slot_positions(shifts_new, V, slots)
+        counts = [len(p) for p in positions]
+        moves[kind] = _rebalance_slots(
+            shifts_new, guards, zone_masks, positions, counts, total_count, False
+        )
 
-                    shifts_new[idx_d][slot] = g_low
-                    night_count[g_low] += 1
-                    night_count[g_high] -= 1
+    # ... then the totals, without changing how many guards have q or q + 1
+    moves["total"] = 0
+    improved = True
+    while improved:
+        improved = False
+        for slots in kinds.values():
+            positions = _get_slot_positions(shifts_new, V, slots)
+            counts = [len(p) for p in positions]
+            moved = _rebalance_slots(
+                shifts_new, guards, zone_masks, positions, counts, total_count, True
+            )
+            moves["total"] += moved
+            improved = improved or moved > 0
 
-                    improved = True
-                    break
-                if improved:
-                    break
-            if improved:
-                break
-        if not improved:
-            break
+    if stats is not None:
+        for kind, moved in moves.items():
+            stats[f"{kind}_moves"] = moved
 
     return shifts_new
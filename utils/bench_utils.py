@@ -0,0 +1,132 @@
+import json
+import random as r
+from pathlib import Path
+
+from utils.algo_utils import (
+    get_quotas_and_days_sorted,
+    init_solution,
+    optimize_schedule,
+    repair_fairness,
+)
+from utils.data_utils import parse_input, save_output
+from utils.helpers import (
+    _get_coverage_score,
+    _get_fairness_penalty,
+    _get_pref_score,
+    _get_zone_masks,
+    _is_schedule_valid,
+)
+from utils.telemetry_utils import finish_search_telemetry, new_telemetry, phase
+
+MIN_GUARDS_PER_WEEKDAY = 3
+
+
+def generate_instance(
+    fout: Path,
+    guards: int,
+    pref_density: float,
+    forbidden_density: float,
+    rng: r.Random,
+) -> None:
+    week = range(1, 8)
+    allowed_per_weekday = {d: guards for d in week}
+    lines: list[str] = []
+
+    for _ in range(guards):
+        prefs = [d for d in week if rng.random() < pref_density]
+        if not prefs:
+            prefs = [rng.randint(1, 7)]
+
+        # at most one forbidden weekday per guard (as in the assignment),
+        # never a preferred one and never below 3 guards for that weekday
+        tokens = [str(d) for d in prefs]
+        if rng.random() < forbidden_density:
+            candidates = [
+                d
+                for d in week
+                if d not in prefs and allowed_per_weekday[d] > MIN_GUARDS_PER_WEEKDAY
+            ]
+            if candidates:
+                forbidden = rng.choice(candidates)
+                allowed_per_weekday[forbidden] -= 1
+                tokens.append(f"E{forbidden}")
+
+        lines.append(" ".join(tokens) + "\n")
+
+    fout.parent.mkdir(parents=True, exist_ok=True)
+    with open(file=fout, encoding="utf-8", mode="w") as f:
+        f.writelines(lines)
+
+
+def time_phases(
+    fin: Path, fout: Path, days: int, max_iter: int, seed: int
+) -> dict:
+    telemetry = new_telemetry()
+    stats: dict = {}
+    rng = r.Random(seed)
+
+    with phase(telemetry, "parse"):
+        guards = parse_input(fin)
+    with phase(telemetry, "quota"):
+        quotas, available = get_quotas_and_days_sorted(guards, days)
+        zone_masks = _get_zone_masks(guards)
+    with phase(telemetry, "construction"):
+        shifts_1 = init_solution(guards, available, quotas)
+    with phase(telemetry, "optimization"):
+        shifts_2 = optimize_schedule(
+            shifts_1, guards, rng, max_iter, zone_masks, stats=stats
+        )
+    with phase(telemetry, "repair"):
+        shifts_2 = repair_fairness(shifts_2, guards, zone_masks)
+    with phase(telemetry, "save"):
+        save_output(fout, shifts_2)
+
+    finish_search_telemetry(telemetry, stats)
+    phases = telemetry["phases"]
+
+    return {
+        "phases": phases,
+        "total": sum(phases.values()),
+        "valid": _is_schedule_valid(shifts_2, guards),
+        "pref": _get_pref_score(shifts_2, guards),
+        "cov": _get_coverage_score(shifts_2, guards, zone_masks),
+        "penalty": _get_fairness_penalty(shifts_2, guards),
+        "iterations_per_sec": telemetry["search"]["iterations_per_sec"],
+    }
+
+
+def run_benchmark(
+    guard_grid: list[int],
+    days_grid: list[int],
+    max_iter: int,
+    seed: int,
+    work_dir: Path,
+    fresults: Path,
+    pref_density: float = 0.5,
+    forbidden_density: float = 0.3,
+) -> list[dict]:
+    results: list[dict] = []
+
+    for V in guard_grid:
+        fin = work_dir / f"input_{V}.txt"
+        generate_instance(fin, V, pref_density, forbidden_density, r.Random(seed))
+
+        for days in days_grid:
+            fout = work_dir / f"output_{V}_{days}.txt"
+            row = {
+                "guards": V,
+                "days": days,
+                "max_iter": max_iter,
+                "seed": seed,
+                "pref_density": pref_density,
+                "forbidden_density": forbidden_density,
+            }
+            row.update(time_phases(fin, fout, days, max_iter, seed))
+            results.append(row)
+            print(f" • V = {V}, days = {days}: {row['total']:.4f} s")
+
+    fresults.parent.mkdir(parents=True, exist_ok=True)
+    with open(file=fresults, encoding="utf-8", mode="w") as f:
+        json.dump(results, f, indent=2)
+
+    return results
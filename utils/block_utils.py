@@ -0,0 +1,175 @@
+import os
+import random as r
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+
+from utils.algo_utils import get_score_upper_bound, init_solution
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _days_sorted_by_difficulty,
+    _get_block_quota,
+    _get_coverage_score,
+    _get_fairness_penalty,
+    _get_pref_score,
+    _get_quota,
+    _get_zone_masks,
+)
+from utils.move_utils import MoveKind
+from utils.search_utils import DEFAULT_MAX_ITER, Engine, run_engine
+from utils.seed_utils import derive_seed, spawn_rng
+
+# (first day, number of days), 0-based
+Block = tuple[int, int]
+
+# per-process instance state, filled once by `_init_block_worker`
+_worker_state: dict = {}
+
+
+def get_blocks(days: int, block_weeks: int) -> list[Block]:
+    # blocks start on the same weekday as the horizon, so `_day_of_the_week`
+    # of a block-local day is the weekday of the global one
+    size = 7 * block_weeks
+    return [(start, min(size, days - start)) for start in range(0, days, size)]
+
+
+def init_blocks(guards: GuardTable, blocks: list[Block], days: int) -> list[list[int]]:
+    # day shifts and night shifts are two horizon-wide round robins, nights
+    # continue where the extra dayshifts stopped so the totals stay within 1
+    r_d = _get_quota(guards, days)["r_d"]
+    shifts: list[list[int]] = []
+    for start, length in blocks:
+        targets = (
+            _get_block_quota(guards, start, length),
+            _get_block_quota(guards, 2 * start, 2 * length, r_d),
+        )
+        available = _days_sorted_by_difficulty(guards, length)
+        quotas = _get_quota(guards, length)
+        shifts.extend(init_solution(guards, available, quotas, targets))
+    return shifts
+
+
+def _init_block_worker(guards: GuardTable) -> None:
+    _worker_state["guards"] = guards
+    _worker_state["zone_masks"] = _get_zone_masks(guards)
+
+
+def _run_block(
+    shifts: list[list[int]],
+    seed: int,
+    max_iter: int | None,
+    engine: Engine,
+    time_budget: float | None,
+    stagnation: int | None,
+    stop_at_bound: bool,
+    moves: dict[MoveKind, float] | None,
+) -> tuple[list[list[int]], dict]:
+    t1 = perf_counter()
+
+    guards = _worker_state["guards"]
+    zone_masks = _worker_state["zone_masks"]
+    stats: dict = {}
+    # blocks start on the horizon's weekday, so the bound of a horizon of the
+    # block's length holds for the block
+    upper_bound = None
+    if stop_at_bound:
+        upper_bound = get_score_upper_bound(guards, len(shifts), zone_masks)
+
+    shifts = run_engine(
+        shifts,
+        guards,
+        r.Random(seed),
+        engine,
+        max_iter,
+        time_budget,
+        zone_masks,
+        stats,
+        stagnation,
+        upper_bound,
+        moves,
+    )
+    stats.pop("trajectory", None)
+
+    stats["seed"] = seed
+    stats["pid"] = os.getpid()
+    stats["pref"] = _get_pref_score(shifts, guards)
+    stats["cov"] = _get_coverage_score(shifts, guards, zone_masks)
+    stats["penalty"] = _get_fairness_penalty(shifts, guards)
+    stats["time"] = perf_counter() - t1
+
+    return shifts, stats
+
+
+def solve_blocks(
+    guards: GuardTable,
+    shifts_init: list[list[int]],
+    blocks: list[Block],
+    seed: int,
+    max_iter: int | None,
+    workers: int | None = None,
+    engine: Engine = "hill",
+    time_budget: float | None = None,
+    stagnation: int | None = None,
+    stats: dict | None = None,
+    moves: dict[MoveKind, float] | None = None,
+    upper_bound: tuple[int, int] | None = None,
+) -> tuple[list[list[int]], list[dict]]:
+    # `max_iter` is the total as in a monolithic run: half of it is split over
+    # the blocks by length, the rest goes to the stitching; `time_budget`
+    # holds per block and again for the stitching; with `upper_bound` (of the
+    # whole horizon) every block also stops at its own bound
+    seeds = [derive_seed(seed, "block", i) for i in range(len(blocks))]
+    days = sum(length for _, length in blocks)
+    if max_iter is None and time_budget is None:
+        max_iter = DEFAULT_MAX_ITER
+    block_iter: list[int | None] = [None] * len(blocks)
+    stitch_iter = max_iter
+    if max_iter is not None:
+        block_iter = [max(1, max_iter // 2 * length // days) for _, length in blocks]
+        stitch_iter = max(0, max_iter - sum(block_iter))
+    parts = [shifts_init[start : start + length] for start, length in blocks]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_block_worker,
+        initargs=(guards,),
+    ) as pool:
+        results = list(
+            pool.map(
+                _run_block,
+                parts,
+                seeds,
+                block_iter,
+                repeat(engine),
+                repeat(time_budget),
+                repeat(stagnation),
+                repeat(upper_bound is not None),
+                repeat(moves),
+            )
+        )
+
+    shifts: list[list[int]] = []
+    block_stats: list[dict] = []
+    for (start, length), (part, st) in zip(blocks, results):
+        shifts.extend(part)
+        st["start"] = start
+        st["days"] = length
+        block_stats.append(st)
+
+    # stitching: hill climbing over the whole horizon, swaps across block
+    # borders even out what the blocks could not see of each other
+    shifts = run_engine(
+        shifts,
+        guards,
+        spawn_rng(seed, "stitch"),
+        "hill",
+        stitch_iter,
+        time_budget,
+        _get_zone_masks(guards),
+        stats,
+        stagnation,
+        upper_bound,
+        moves,
+    )
+
+    return shifts, block_stats
@@ -1,29 +1,187 @@
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Iterable
 from pathlib import Path
 
+from utils.guard_utils import GuardTable
 
-def parse_input(fin: Path) -> dict[int, dict[str, set[int]]]:
-    guards: dict[int, dict[str, set[int]]] = {}
+BINARY_SUFFIX = ".bin"
+BINARY_MAGIC = b"HOPS"
+BINARY_VERSION = 1
+# magic, version, id width in bytes, days, guards, pref, cov, penalty, input hash
+_BINARY_HEADER = struct.Struct("<4sHHIIddi16s")
+_ID_TYPECODES = {1: "B", 2: "H", 4: "I"}
+# ids are stored little-endian like the header
+_SWAP_IDS = sys.byteorder == "big"
+
+
+class BinaryHeader:
+    __slots__ = ("days", "guards", "width", "pref", "cov", "penalty", "input_hash")
+
+    def __init__(
+        self,
+        days: int,
+        guards: int,
+        width: int,
+        pref: float,
+        cov: float,
+        penalty: int,
+        input_hash: bytes,
+    ) -> None:
+        self.days = days
+        self.guards = guards
+        self.width = width
+        self.pref = pref
+        self.cov = cov
+        self.penalty = penalty
+        self.input_hash = input_hash
+
+
+def parse_input(fin: Path) -> GuardTable:
     with fin.open(mode="r", encoding="utf-8") as f:
-        idx = 1
+        return parse_guards(f)
 
-        for line in f:
-            prefs = []
-            forbiddens = []
-            line = line.strip()
-            tokens = line.split(" ")
-
-            for t in tokens:
-                if t.startswith("E"):
-                    forbiddens.append(int(t[1:]))
-                    continue
-                prefs.append(int(t))
-            guards[idx] = {"prefs": set(prefs), "forbiddens": set(forbiddens)}
-            idx += 1
+
+def parse_guards(lines: Iterable[str]) -> GuardTable:
+    guards = GuardTable()
+    for line in lines:
+        prefs = []
+        forbiddens = []
+        line = line.strip()
+        tokens = line.split(" ")
+
+        for t in tokens:
+            if t.startswith("E"):
+                forbiddens.append(int(t[1:]))
+                continue
+            prefs.append(int(t))
+        guards.append(prefs, forbiddens)
     return guards
 
 
 def save_output(fout: Path, shifts: list[list[int]]) -> None:
     with open(file=fout, encoding="utf-8", mode="w") as f:
-        for s in shifts:
-            line = " ".join([str(x + 1) for x in s]) + "\n"
-            f.write(line)
+        f.write("".join(f"{d + 1} {n1 + 1} {n2 + 1}\n" for d, n1, n2 in shifts))
+
+
+def load_output(fin: Path) -> list[list[int]]:
+    shifts: list[list[int]] = []
+    with fin.open(mode="r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            shifts.append([int(t) - 1 for t in line.split(" ")])
+    return shifts
+
+
+def get_input_hash(fin: Path) -> bytes:
+    return hashlib.blake2b(fin.read_bytes(), digest_size=16).digest()
+
+
+def _get_id_width(guard_count: int) -> int:
+    if guard_count <= 1 << 8:
+        return 1
+    if guard_count <= 1 << 16:
+        return 2
+    return 4
+
+
+def save_binary(
+    fout: Path,
+    shifts: list[list[int]],
+    guard_count: int,
+    pref: float,
+    cov: float,
+    penalty: int,
+    input_hash: bytes,
+) -> None:
+    # header + 0-based guard ids, 3 per day, as narrow as the guard count allows
+    width = _get_id_width(guard_count)
+    header = _BINARY_HEADER.pack(
+        BINARY_MAGIC,
+        BINARY_VERSION,
+        width,
+        len(shifts),
+        guard_count,
+        pref,
+        cov,
+        penalty,
+        input_hash,
+    )
+    ids = array(_ID_TYPECODES[width], [g for s in shifts for g in s])
+    if _SWAP_IDS:
+        ids.byteswap()
+    with open(file=fout, mode="wb") as f:
+        f.write(header + ids.tobytes())
+
+
+def _unpack_header(data: bytes, fin: Path) -> BinaryHeader:
+    if len(data) < _BINARY_HEADER.size:
+        raise ValueError(
+            f"{fin} is truncated: {len(data)} bytes, "
+            f"the header alone needs {_BINARY_HEADER.size}"
+        )
+    magic, version, width, days, guards, pref, cov, penalty, input_hash = (
+        _BINARY_HEADER.unpack_from(data)
+    )
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"{fin} is not a schedule file (version {BINARY_VERSION})")
+    return BinaryHeader(days, guards, width, pref, cov, penalty, input_hash)
+
+
+def read_binary_header(fin: Path) -> BinaryHeader:
+    with fin.open(mode="rb") as f:
+        return _unpack_header(f.read(_BINARY_HEADER.size), fin)
+
+
+def open_binary(fin: Path) -> tuple[BinaryHeader, memoryview]:
+    # memory-mapped, read-only flat view: guard in `slot` of day d is
+    # ids[3 * d + slot]; the mapping lives as long as the view (big-endian
+    # hosts get a swapped copy instead)
+    with fin.open(mode="rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        header = _unpack_header(mm, fin)
+    except ValueError:
+        mm.close()
+        raise
+    size = header.days * 3 * header.width
+    found = len(mm) - _BINARY_HEADER.size
+    if found < size:
+        mm.close()
+        raise ValueError(
+            f"{fin} is truncated: {header.days} days need {size} bytes of ids, "
+            f"found {found}"
+        )
+    typecode = _ID_TYPECODES[header.width]
+    ids = memoryview(mm)[_BINARY_HEADER.size : _BINARY_HEADER.size + size]
+    if _SWAP_IDS:
+        swapped = array(typecode)
+        swapped.frombytes(ids)
+        ids.release()
+        mm.close()
+        swapped.byteswap()
+        return header, memoryview(swapped)
+    return header, ids.cast(typecode)
+
+
+def load_binary(fin: Path) -> list[list[int]]:
+    _, ids = open_binary(fin)
+    flat = ids.tolist()
+    ids.release()
+    return [flat[i : i + 3] for i in range(0, len(flat), 3)]
+
+
+def load_schedule(fin: Path, planned_for: Path | None = None) -> list[list[int]]:
+    # text or binary by suffix; a binary schedule is checked against the input
+    # it was planned for when `planned_for` is given
+    if fin.suffix != BINARY_SUFFIX:
+        return load_output(fin)
+    if planned_for is not None:
+        if read_binary_header(fin).input_hash != get_input_hash(planned_for):
+            raise ValueError(f"{fin} was not planned for {planned_for}")
+    return load_binary(fin)
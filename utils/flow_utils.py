@@ -0,0 +1,282 @@
+import heapq
+
+from utils.guard_utils import GuardTable
+from utils.helpers import _day_of_the_week, _get_quota, _is_forbidden, _is_pref
+
+INF = float("inf")
+
+# residual graph: adjacency lists of edge ids + per-edge target, capacity, cost;
+# edge `e ^ 1` is the reverse of edge `e`
+FlowGraph = tuple[list[list[int]], list[int], list[int], list[int]]
+
+
+def _new_graph(n: int) -> FlowGraph:
+    return [[] for _ in range(n)], [], [], []
+
+
+def _add_edge(graph: FlowGraph, u: int, v: int, cap: int, cost: int) -> int:
+    adj, to, caps, costs = graph
+    e = len(to)
+    adj[u].append(e)
+    to.append(v)
+    caps.append(cap)
+    costs.append(cost)
+    adj[v].append(e + 1)
+    to.append(u)
+    caps.append(0)
+    costs.append(-cost)
+    return e
+
+
+def _min_cost_flow(graph: FlowGraph, s: int, t: int, max_flow: int) -> tuple[int, int]:
+    # successive shortest paths, Dijkstra on reduced costs (all costs >= 0)
+    adj, to, caps, costs = graph
+    n = len(adj)
+    potential = [0] * n
+    flow = 0
+    cost = 0
+
+    while flow < max_flow:
+        dist = [INF] * n
+        prev_edge = [-1] * n
+        dist[s] = 0
+        heap = [(0, s)]
+
+        while heap:
+            d_u, u = heapq.heappop(heap)
+            if d_u > dist[u]:
+                continue
+            p_u = potential[u]
+            for e in adj[u]:
+                if caps[e] <= 0:
+                    continue
+                v = to[e]
+                d_v = d_u + costs[e] + p_u - potential[v]
+                if d_v < dist[v]:
+                    dist[v] = d_v
+                    prev_edge[v] = e
+                    heapq.heappush(heap, (d_v, v))
+
+        if dist[t] == INF:
+            break
+
+        for v in range(n):
+            if dist[v] < INF:
+                potential[v] += dist[v]
+
+        # bottleneck along the path
+        push = max_flow - flow
+        v = t
+        while v != s:
+            e = prev_edge[v]
+            push = min(push, caps[e])
+            v = to[e ^ 1]
+
+        v = t
+        while v != s:
+            e = prev_edge[v]
+            caps[e] -= push
+            caps[e ^ 1] += push
+            cost += push * costs[e]
+            v = to[e ^ 1]
+
+        flow += push
+
+    return flow, cost
+
+
+def _spread_over_days(
+    on_day: list[list[int]],
+    idx_ds: list[int],
+    counts: list[tuple[int, int]],
+    excluded: list[int] | None,
+) -> None:
+    # round robin over the days of one weekday: a guard with c <= len(idx_ds)
+    # shifts lands on c different days and every day gets the same number
+    n = len(idx_ds)
+    k = 0
+    for idx_g, c in counts:
+        for _ in range(c):
+            on_day[idx_ds[k % n]].append(idx_g)
+            k += 1
+    if excluded is None:
+        return
+
+    # a guard dealt onto its excluded day trades places with a guard of a day
+    # it may take; every trade removes a conflict and creates none
+    for idx_d in idx_ds:
+        idx_g = excluded[idx_d]
+        if idx_g not in on_day[idx_d]:
+            continue
+        for idx_d2 in idx_ds:
+            if excluded[idx_d2] == idx_g or idx_g in on_day[idx_d2]:
+                continue
+            idx_h = next((h for h in on_day[idx_d2] if h not in on_day[idx_d]), None)
+            if idx_h is None:
+                continue
+            on_day[idx_d].remove(idx_g)
+            on_day[idx_d].append(idx_h)
+            on_day[idx_d2].remove(idx_h)
+            on_day[idx_d2].append(idx_g)
+            break
+
+
+def _assign_guards_to_days(
+    guards: GuardTable,
+    days: int,
+    base_quota: int,
+    pools: list[int],
+    per_day: int,
+    excluded: list[int] | None = None,
+) -> tuple[list[list[int]], int] | None:
+    # source → guard (base_quota) and source → extra pool (r) → guard (1),
+    # guard → weekday (its days of that weekday, cost 1 - pref) keeps one shift
+    # per guard and day once spread, weekday → sink (per_day per day);
+    # `excluded[idx_d]` is a guard already on that day
+    V = len(guards)
+    days_by_weekday: list[list[int]] = [[] for _ in range(7)]
+    for idx_d in range(days):
+        days_by_weekday[_day_of_the_week(idx_d + 1) - 1].append(idx_d)
+    excluded_count = [[0] * 7 for _ in range(V)]
+    if excluded is not None:
+        for idx_d, idx_g in enumerate(excluded):
+            excluded_count[idx_g][_day_of_the_week(idx_d + 1) - 1] += 1
+
+    s = 0
+    pool_node = 1
+    guard_node = pool_node + len(pools)
+    weekday_node = guard_node + V
+    t = weekday_node + 7
+    graph = _new_graph(t + 1)
+
+    for i, r in enumerate(pools):
+        _add_edge(graph, s, pool_node + i, r, 0)
+
+    assign_edges: list[tuple[int, int, int]] = []
+    for idx_g in range(V):
+        u = guard_node + idx_g
+        _add_edge(graph, s, u, base_quota, 0)
+        for i in range(len(pools)):
+            _add_edge(graph, pool_node + i, u, 1, 0)
+
+        for w, idx_ds in enumerate(days_by_weekday):
+            cap = len(idx_ds) - excluded_count[idx_g][w]
+            if cap <= 0 or _is_forbidden(guards, idx_g, w + 1):
+                continue
+            cost = 1 - _is_pref(guards, idx_g, w + 1)
+            e = _add_edge(graph, u, weekday_node + w, cap, cost)
+            assign_edges.append((e, idx_g, w))
+
+    for w, idx_ds in enumerate(days_by_weekday):
+        _add_edge(graph, weekday_node + w, t, per_day * len(idx_ds), 0)
+
+    flow, cost = _min_cost_flow(graph, s, t, per_day * days)
+    if flow < per_day * days:
+        return None
+
+    # the flow on edge `e` is the capacity of its reverse edge
+    caps = graph[2]
+    counts: list[list[tuple[int, int]]] = [[] for _ in range(7)]
+    for e, idx_g, w in assign_edges:
+        if caps[e ^ 1] > 0:
+            counts[w].append((idx_g, caps[e ^ 1]))
+
+    on_day: list[list[int]] = [[] for _ in range(days)]
+    for idx_ds, counts_w in zip(days_by_weekday, counts):
+        _spread_over_days(on_day, idx_ds, counts_w, excluded)
+
+    return on_day, cost
+
+
+def _pick_day_guards(
+    on_day: list[list[int]], V: int, quotas: dict[str, int]
+) -> list[int] | None:
+    # day → one of its three guards (1) → sink; a guard with T shifts needs
+    # q_d..q_d+1 day and q_n..q_n+1 night shifts, i.e. lo..hi day shifts –
+    # the first lo units are free and the rest cost 1, so a max flow of min
+    # cost saturates every lower bound whenever that is possible
+    q_d, q_n = quotas["q_d"], quotas["q_n"]
+    days = len(on_day)
+    s = 0
+    day_node = 1
+    guard_node = day_node + days
+    t = guard_node + V
+    graph = _new_graph(t + 1)
+
+    total_count = [0] * V
+    pick_edges: list[tuple[int, int, int]] = []
+    for idx_d, idx_gs in enumerate(on_day):
+        _add_edge(graph, s, day_node + idx_d, 1, 0)
+        for idx_g in idx_gs:
+            e = _add_edge(graph, day_node + idx_d, guard_node + idx_g, 1, 0)
+            pick_edges.append((e, idx_g, idx_d))
+            total_count[idx_g] += 1
+
+    lower_edges: list[int] = []
+    for idx_g in range(V):
+        lo = max(q_d, total_count[idx_g] - q_n - 1)
+        hi = min(q_d + 1, total_count[idx_g] - q_n)
+        if lo > hi:
+            return None
+        lower_edges.append(_add_edge(graph, guard_node + idx_g, t, lo, 0))
+        _add_edge(graph, guard_node + idx_g, t, hi - lo, 1)
+
+    flow, _ = _min_cost_flow(graph, s, t, days)
+    caps = graph[2]
+    if flow < days or any(caps[e] > 0 for e in lower_edges):
+        return None
+
+    day_guard = [-1] * days
+    for e, idx_g, idx_d in pick_edges:
+        if caps[e] == 0:
+            day_guard[idx_d] = idx_g
+
+    return day_guard
+
+
+def _assign_total(
+    guards: GuardTable, days: int, quotas: dict[str, int]
+) -> tuple[list[list[int]], int] | None:
+    # three guards per day under total (day + night) quotas, ignoring the
+    # shift type – every quota-respecting schedule is feasible here
+    return _assign_guards_to_days(
+        guards,
+        days,
+        quotas["q_d"] + quotas["q_n"],
+        [quotas["r_d"], quotas["r_n"]],
+        per_day=3,
+    )
+
+
+def init_solution_flow(guards: GuardTable, days: int) -> list[list[int]] | None:
+    quotas = _get_quota(guards, days)
+
+    # exact: preference-optimal guards per day, then split them into 1 day +
+    # 2 night shifts with the exact day (and thus night) quotas
+    total = _assign_total(guards, days, quotas)
+    if total is None:
+        return None
+    on_day, _ = total
+    day_guard = _pick_day_guards(on_day, len(guards), quotas)
+
+    if day_guard is not None:
+        shifts: list[list[int]] = []
+        for idx_gs, g_d in zip(on_day, day_guard):
+            g_n1, g_n2 = sorted(g for g in idx_gs if g != g_d)
+            shifts.append([g_d, g_n1, g_n2])
+        return shifts
+
+    # fallback: preference-optimal dayshifts, then preference-optimal
+    # nightshifts on top of them
+    day = _assign_guards_to_days(guards, days, quotas["q_d"], [quotas["r_d"]], 1)
+    if day is None:
+        return None
+    day_guard = [idx_gs[0] for idx_gs in day[0]]
+
+    night = _assign_guards_to_days(
+        guards, days, quotas["q_n"], [quotas["r_n"]], 2, excluded=day_guard
+    )
+    if night is None:
+        return None
+
+    return [[g_d, *sorted(idx_gs)] for g_d, idx_gs in zip(day_guard, night[0])]
@@ -0,0 +1,26 @@
+from array import array
+from collections.abc import Iterable
+
+
+class GuardTable:
+    # bit (weekday - 1) of prefs[idx_g] / forbiddens[idx_g] is set when the
+    # weekday is preferred / forbidden for the (0-based) guard idx_g
+    __slots__ = ("prefs", "forbiddens")
+
+    def __init__(self) -> None:
+        self.prefs = array("B")
+        self.forbiddens = array("B")
+
+    def __len__(self) -> int:
+        return len(self.prefs)
+
+    def append(self, prefs: Iterable[int], forbiddens: Iterable[int]) -> None:
+        self.prefs.append(_to_mask(prefs))
+        self.forbiddens.append(_to_mask(forbiddens))
+
+
+def _to_mask(weekdays: Iterable[int]) -> int:
+    mask = 0
+    for d in weekdays:
+        mask |= 1 << (d - 1)
+    return mask
@@ -1,11 +1,12 @@
+import heapq
 import random as r
-from copy import deepcopy
-from typing import Literal
+from typing import Callable, Literal
 
-EPS = 1e-6
+from utils.guard_utils import GuardTable
+from utils.schedule_utils import Move, Schedule
 
 
-def _get_quota(guards: dict[int, dict[str, set[int]]], days: int) -> dict[str, int]:
+def _get_quota(guards: GuardTable, days: int) -> dict[str, int]:
     V = len(guards)
 
     # dayshifts
@@ -25,16 +26,27 @@ def _get_quota(guards: dict[int, dict[str, set[int]]], days: int) -> dict[str, i
     return quotas
 
 
-def _init_guards_quantity_per_weekday(
-    guards: dict[int, dict[str, set[int]]],
-) -> dict[int, int]:
+def _get_block_quota(
+    guards: GuardTable, start: int, days: int, offset: int = 0
+) -> list[int]:
+    # slot k of a horizon-wide round robin goes to guard (k + offset) % V, so
+    # the per-block counts add up to `_get_quota` over the whole horizon
+    V = len(guards)
+    end = start + days
+    quota = []
+    for idx_g in range(V):
+        res = (idx_g - offset) % V
+        quota.append((end - res + V - 1) // V - (start - res + V - 1) // V)
+    return quota
+
+
+def _init_guards_quantity_per_weekday(guards: GuardTable) -> dict[int, int]:
     quantity_per_weekday: dict[int, int] = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0}
     week = range(1, 8)
 
-    for idx in guards:
-        forbiddens = set(guards[idx]["forbiddens"])
+    for forbiddens in guards.forbiddens:
         for d in week:
-            if d not in forbiddens:
+            if not forbiddens >> (d - 1) & 1:
                 quantity_per_weekday[d] += 1
 
     return quantity_per_weekday
@@ -47,7 +59,7 @@ def _day_of_the_week(idx: int) -> int:
 
 
 def _days_sorted_by_difficulty(
-    guards: dict[int, dict[str, set[int]]], days: int
+    guards: GuardTable, days: int
 ) -> list[tuple[int, int, int]]:
     quantity_per_weekday = _init_guards_quantity_per_weekday(guards)
     available: list[tuple[int, int, int]] = []
@@ -62,148 +74,139 @@ def _days_sorted_by_difficulty(
     return available
 
 
-def _is_pref(guards: dict[int, dict[str, set[int]]], g, weekday: int) -> int:
-    if weekday in guards[g]["prefs"]:
-        return 1
-    return 0
+def _is_pref(guards: GuardTable, idx_g: int, weekday: int) -> int:
+    return guards.prefs[idx_g] >> (weekday - 1) & 1
 
 
-def _is_candidate_better(
-    best_idx: int,
-    idx_g: int,
-    best_pref: int,
-    cur_pref: int,
-    best_shift_count: int,
-    cur_shift_count: int,
-) -> bool:
-    # compare preferences
-    if cur_pref > best_pref:
-        return True
-    if cur_pref < best_pref:
-        return False
+def _is_forbidden(guards: GuardTable, idx_g: int, weekday: int) -> int:
+    return guards.forbiddens[idx_g] >> (weekday - 1) & 1
 
-    # preferences equal → compare shift_count
-    if cur_shift_count < best_shift_count:
-        return True
-    if cur_shift_count > best_shift_count:
-        return False
 
-    # shift_count equal → tie-break by index
-    return idx_g < best_idx
+# heap entries end with the guard index; the key before it orders candidates
+HeapEntry = tuple[int, ...]
+
+
+def _get_weekday_heap(
+    heaps: dict[int, list[HeapEntry]],
+    guards: GuardTable,
+    weekday: int,
+    key: Callable[[int, int], HeapEntry],
+) -> list[HeapEntry]:
+    # built on first use, so only weekdays that occur in `available` cost O(V)
+    heap = heaps.get(weekday)
+    if heap is None:
+        shift = weekday - 1
+        forbiddens = guards.forbiddens
+        heap = [
+            key(idx_g, shift)
+            for idx_g in range(len(guards))
+            if not forbiddens[idx_g] >> shift & 1
+        ]
+        heapq.heapify(heap)
+        heaps[weekday] = heap
+    return heap
+
+
+def _push_guard(
+    heaps: dict[int, list[HeapEntry]],
+    guards: GuardTable,
+    idx_g: int,
+    key: Callable[[int, int], HeapEntry],
+) -> None:
+    # the guard's count changed: its old entries are stale from now on
+    forbiddens = guards.forbiddens[idx_g]
+    for weekday, heap in heaps.items():
+        shift = weekday - 1
+        if not forbiddens >> shift & 1:
+            heapq.heappush(heap, key(idx_g, shift))
+
+
+def _pop_best(
+    heap: list[HeapEntry], is_valid: Callable[[HeapEntry], bool], s: list[int]
+) -> HeapEntry | None:
+    # invalid entries are stale or can never be picked again and are dropped,
+    # guards already serving on this day are put back for the next days
+    busy: list[HeapEntry] = []
+    best = None
+    while heap:
+        entry = heapq.heappop(heap)
+        if not is_valid(entry):
+            continue
+        if entry[-1] in s:
+            busy.append(entry)
+            continue
+        best = entry
+        break
+
+    for entry in busy:
+        heapq.heappush(heap, entry)
+    return best
 
 
 def _dayshift(
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
     available: list[tuple[int, int, int]],
     quotas: dict[str, int],
     day_count: list[int],
     shifts: list[list[int]],
     extra_day_used: int,
     unavailable_day_guards: set[int],
+    day_quota: list[int] | None = None,
 ) -> tuple[list[int], int, list[list[int]], set[int]]:
-    V = len(guards)
+    prefs = guards.prefs
 
     q_d = quotas["q_d"]
     r_d = quotas["r_d"]
 
-    extra_day_used = 0
+    # best candidate: preferred, then fewest dayshifts, then lowest index
+    def key(idx_g: int, shift: int) -> HeapEntry:
+        return (-(prefs[idx_g] >> shift & 1), day_count[idx_g], idx_g)
 
-    for d, weekday, _ in available:
-        idx_d = d - 1
-        best_idx: int | None = None
-        best_pref: int | None = None
-        best_shift_count: int | None = None
+    # counts and `extra_day_used` only grow, so a guard over quota stays over
+    def is_within_quota(entry: HeapEntry) -> bool:
+        _, count, idx_g = entry
+        if count != day_count[idx_g]:
+            return False
+        if day_quota is not None:
+            return count < day_quota[idx_g]
+        return count < q_d or (count == q_d and extra_day_used < r_d)
 
-        fallback: bool = False
+    def is_available(entry: HeapEntry) -> bool:
+        _, count, idx_g = entry
+        return count == day_count[idx_g] and idx_g not in unavailable_day_guards
 
-        # dayshift
-        for g in guards:
-            idx_g = g - 1
-            if weekday in guards[g]["forbiddens"]:
-                continue
-            if idx_g in shifts[idx_d]:
-                continue
+    heaps: dict[int, list[HeapEntry]] = {}
+    fallback_heaps: dict[int, list[HeapEntry]] = {}
 
-            cur_pref = _is_pref(guards, g, weekday)
-            cur_shift_count = day_count[idx_g]
-
-            if cur_shift_count < q_d or (
-                cur_shift_count == q_d and extra_day_used < r_d
-            ):
-                if best_idx is None:
-                    best_idx = idx_g
-                    best_pref = cur_pref
-                    best_shift_count = cur_shift_count
-                    continue
-
-                candidate_is_better = _is_candidate_better(
-                    best_idx=best_idx,
-                    idx_g=idx_g,
-                    best_pref=best_pref,
-                    cur_pref=cur_pref,
-                    best_shift_count=best_shift_count,
-                    cur_shift_count=cur_shift_count,
-                )
-                if candidate_is_better:
-                    best_idx = idx_g
-                    best_pref = cur_pref
-                    best_shift_count = cur_shift_count
-                    continue
-
-        if best_idx is None:
-            fallback = True
-        else:
-            shifts[idx_d][0] = best_idx
+    for d, weekday, _ in available:
+        s = shifts[d - 1]
+
+        # dayshift
+        heap = _get_weekday_heap(heaps, guards, weekday, key)
+        best = _pop_best(heap, is_within_quota, s)
+        if best is not None:
+            _, best_shift_count, best_idx = best
+            s[0] = best_idx
             day_count[best_idx] += 1
             if best_shift_count == q_d and extra_day_used < r_d:
                 extra_day_used += 1
 
         # dayshift fallback
-        if fallback:
-            best_idx = None
-            best_pref = None
-            best_shift_count = None
-
-            for g in guards:
-                idx_g = g - 1
-                if idx_g not in unavailable_day_guards:
-                    if weekday in guards[g]["forbiddens"]:
-                        continue
-                    if idx_g in shifts[idx_d]:
-                        continue
-
-                    cur_pref = _is_pref(guards, g, weekday)
-                    cur_shift_count = day_count[idx_g]
-
-                    if best_idx is None:
-                        best_idx = idx_g
-                        best_pref = cur_pref
-                        best_shift_count = cur_shift_count
-                        continue
-
-                    candidate_is_better = _is_candidate_better(
-                        best_idx=best_idx,
-                        idx_g=idx_g,
-                        best_pref=best_pref,
-                        cur_pref=cur_pref,
-                        best_shift_count=best_shift_count,
-                        cur_shift_count=cur_shift_count,
-                    )
-                    if candidate_is_better:
-                        best_idx = idx_g
-                        best_pref = cur_pref
-                        best_shift_count = cur_shift_count
-                        continue
-
-            shifts[idx_d][0] = best_idx
+        else:
+            heap = _get_weekday_heap(fallback_heaps, guards, weekday, key)
+            best_idx = _pop_best(heap, is_available, s)[-1]
+            s[0] = best_idx
             day_count[best_idx] += 1
             unavailable_day_guards.add(best_idx)
 
+        _push_guard(heaps, guards, best_idx, key)
+        _push_guard(fallback_heaps, guards, best_idx, key)
+
     return (day_count, extra_day_used, shifts, unavailable_day_guards)
 
 
 def _nightshift(
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
     available: list[tuple[int, int, int]],
     quotas: dict[str, int],
     day_count: list[int],
@@ -212,131 +215,132 @@ def _nightshift(
     extra_night_used: int,
     unavailable_night_guards: set[int],
     nightshift_num: Literal[1, 2],
+    night_quota: list[int] | None = None,
 ) -> tuple[list[int], int, list[list[int]], set[int]]:
+    prefs = guards.prefs
+
     q_n = quotas["q_n"]
     r_n = quotas["r_n"]
 
-    for d, weekday, _ in available:
-        idx_d = d - 1
-        best_idx: int | None = None
-        best_pref: int | None = None
-        best_shift_count: int | None = None
+    # best candidate: preferred, then fewest nightshifts, then lowest index
+    def key(idx_g: int, shift: int) -> HeapEntry:
+        return (-(prefs[idx_g] >> shift & 1), night_count[idx_g], idx_g)
 
-        fallback: bool = False
+    # fallback: fewest nightshifts, then preferred, then fewest shifts in total
+    def fallback_key(idx_g: int, shift: int) -> HeapEntry:
+        cur_night = night_count[idx_g]
+        cur_pref = prefs[idx_g] >> shift & 1
+        return (cur_night, -cur_pref, day_count[idx_g] + cur_night, idx_g)
 
-        # nightshift
-        for g in guards:
-            idx_g = g - 1
-            if weekday in guards[g]["forbiddens"]:
-                continue
-            if idx_g in shifts[idx_d]:
-                continue
+    # counts and `extra_night_used` only grow, so a guard over quota stays over
+    def is_within_quota(entry: HeapEntry) -> bool:
+        _, count, idx_g = entry
+        if count != night_count[idx_g]:
+            return False
+        if night_quota is not None:
+            return count < night_quota[idx_g]
+        return count < q_n or (count == q_n and extra_night_used < r_n)
 
-            cur_pref = _is_pref(guards, g, weekday)
-            cur_shift_count = night_count[idx_g]
-
-            if cur_shift_count < q_n or (
-                cur_shift_count == q_n and extra_night_used < r_n
-            ):
-                if best_idx is None:
-                    best_idx = idx_g
-                    best_pref = cur_pref
-                    best_shift_count = cur_shift_count
-                    continue
-
-                candidate_is_better = _is_candidate_better(
-                    best_idx=best_idx,
-                    idx_g=idx_g,
-                    best_pref=best_pref,
-                    cur_pref=cur_pref,
-                    best_shift_count=best_shift_count,
-                    cur_shift_count=cur_shift_count,
-                )
-                if candidate_is_better:
-                    best_idx = idx_g
-                    best_pref = cur_pref
-                    best_shift_count = cur_shift_count
-                    continue
-
-        if best_idx is None:
-            fallback = True
-        else:
-            shifts[idx_d][nightshift_num] = best_idx
+    def is_available(entry: HeapEntry) -> bool:
+        idx_g = entry[-1]
+        return entry[0] == night_count[idx_g] and idx_g not in unavailable_night_guards
+
+    heaps: dict[int, list[HeapEntry]] = {}
+    fallback_heaps: dict[int, list[HeapEntry]] = {}
+
+    for d, weekday, _ in available:
+        s = shifts[d - 1]
+
+        # nightshift
+        heap = _get_weekday_heap(heaps, guards, weekday, key)
+        best = _pop_best(heap, is_within_quota, s)
+        if best is not None:
+            _, best_shift_count, best_idx = best
+            s[nightshift_num] = best_idx
             night_count[best_idx] += 1
             if best_shift_count == q_n and extra_night_used < r_n:
                 extra_night_used += 1
 
         # nightshift fallback
-        if fallback:
-            best_idx = None
-            best_pref = None
-            best_shift_count = None
-            min_night = None
-
-            for g in guards:
-                idx_g = g - 1
-                if idx_g not in unavailable_night_guards:
-                    if weekday in guards[g]["forbiddens"]:
-                        continue
-                    if idx_g in shifts[idx_d]:
-                        continue
-
-                    cur_night = night_count[idx_g]
-                    cur_pref = _is_pref(guards, g, weekday)
-                    cur_shift_count = day_count[idx_g] + night_count[idx_g]
-
-                    if min_night is None or cur_night < min_night:
-                        min_night = cur_night
-                        best_idx = idx_g
-                        best_pref = cur_pref
-                        best_shift_count = cur_shift_count
-                        continue
-
-                    if cur_night > min_night:
-                        continue
-
-                    candidate_is_better = _is_candidate_better(
-                        best_idx=best_idx,
-                        idx_g=idx_g,
-                        best_pref=best_pref,
-                        cur_pref=cur_pref,
-                        best_shift_count=best_shift_count,
-                        cur_shift_count=cur_shift_count,
-                    )
-                    if candidate_is_better:
-                        best_idx = idx_g
-                        best_pref = cur_pref
-                        best_shift_count = cur_shift_count
-                        continue
-
-            shifts[idx_d][nightshift_num] = best_idx
+        else:
+            heap = _get_weekday_heap(fallback_heaps, guards, weekday, fallback_key)
+            best_idx = _pop_best(heap, is_available, s)[-1]
+            s[nightshift_num] = best_idx
             night_count[best_idx] += 1
             unavailable_night_guards.add(best_idx)
 
+        _push_guard(heaps, guards, best_idx, key)
+        _push_guard(fallback_heaps, guards, best_idx, fallback_key)
+
     return (night_count, extra_night_used, shifts, unavailable_night_guards)
 
 
-def _get_zones(guards: dict[int, dict[str, set[int]]]) -> dict[int, set[int]]:
-    def mirror(i: int, V: int) -> int:
-        return V - i + 1
+def _get_zones(guards: GuardTable) -> list[set[int]]:
+    def mirror(idx: int, V: int) -> int:
+        return V - 1 - idx
 
+    # zones[idx_g] holds the (0-based) gardens guarded by idx_g
     V = len(guards)
-    zones: dict[int, set[int]] = {}
+    zones: list[set[int]] = []
 
-    for i in guards:
-        left = max(1, i - 5)
-        right = min(V, i + 5) + 1
+    for idx_g in range(V):
+        left = max(0, idx_g - 5)
+        right = min(V - 1, idx_g + 5) + 1
         solo_cov = set(range(left, right))
-        solo_cov_mir = {mirror(i, V) for i in solo_cov}
+        solo_cov_mir = {mirror(idx, V) for idx in solo_cov}
         total_cov = solo_cov | solo_cov_mir
-        zones[i] = total_cov
+        zones.append(total_cov)
 
     return zones
 
 
-def _is_schedule_valid(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
-) -> bool:
+def _get_zone_masks(guards: GuardTable) -> list[int]:
+    zone_masks: list[int] = []
+
+    for cov in _get_zones(guards):
+        mask = 0
+        for garden in cov:
+            mask |= 1 << garden
+        zone_masks.append(mask)
+
+    return zone_masks
+
+
+def _get_coverage_upper_bound(
+    guards: GuardTable, days: int, zone_masks: list[int]
+) -> int:
+    # per day at most the three largest zones of guards allowed on that weekday
+    V = len(guards)
+    day_bound: dict[int, int] = {}
+    for d in range(1, 8):
+        sizes = [
+            zone_masks[idx_g].bit_count()
+            for idx_g in range(V)
+            if not _is_forbidden(guards, idx_g, d)
+        ]
+        sizes.sort(reverse=True)
+        day_bound[d] = min(V, sum(sizes[:3]))
+
+    return sum(day_bound[_day_of_the_week(idx_d + 1)] for idx_d in range(days))
+
+
+def _get_pref_upper_bound(guards: GuardTable, days: int) -> int:
+    # per day at most three allowed guards who prefer that weekday; the quotas
+    # are not hard constraints, so they do not tighten it
+    V = len(guards)
+    day_bound: dict[int, int] = {}
+    for d in range(1, 8):
+        preferring = sum(
+            1
+            for idx_g in range(V)
+            if _is_pref(guards, idx_g, d) and not _is_forbidden(guards, idx_g, d)
+        )
+        day_bound[d] = min(3, preferring)
+
+    return sum(day_bound[_day_of_the_week(idx_d + 1)] for idx_d in range(days))
+
+
+def _is_schedule_valid(shifts: list[list[int]], guards: GuardTable) -> bool:
     V = len(guards)
     days = len(shifts)
 
@@ -357,10 +361,7 @@ def _is_schedule_valid(
                 return False
 
         # validate hard constraint 2 (different guard for every shift position)
-        g_d_idx, g_n1_idx, g_n2_idx = s
-        g_d = g_d_idx + 1
-        g_n1 = g_n1_idx + 1
-        g_n2 = g_n2_idx + 1
+        g_d, g_n1, g_n2 = s
         if g_d == g_n1:
             return False
         if g_d == g_n2:
@@ -370,50 +371,40 @@ def _is_schedule_valid(
 
         # validate hard_constraint 1 (weekday is not forbidden for a guard)
         d = _day_of_the_week(idx_d + 1)
-        for g in (g_d, g_n1, g_n2):
-            forbiddens = guards[g]["forbiddens"]
-            if d in forbiddens:
+        for idx_g in s:
+            if _is_forbidden(guards, idx_g, d):
                 return False
     return True
 
 
-def _get_pref_score(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
-) -> float:
+def _get_pref_score(shifts: list[list[int]], guards: GuardTable) -> float:
     days = len(shifts)
     score_raw = 0
     for idx_d, s in enumerate(shifts):
+        d = _day_of_the_week(idx_d + 1)
         for idx_g in s:
-            g = idx_g + 1
-            d = _day_of_the_week(idx_d + 1)
-            prefs = guards[g]["prefs"]
-            if d in prefs:
-                score_raw += 1
+            score_raw += _is_pref(guards, idx_g, d)
     return score_raw / (days * 3)
 
 
 def _get_coverage_score(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int] | None = None,
 ) -> float:
     V = len(guards)
     days = len(shifts)
-    zones: dict[int, set[int]] = _get_zones(guards)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
     score_raw = 0
 
     for s in shifts:
-        total_cov = set()
-        for idx_g in s:
-            g = idx_g + 1
-            solo_cov = zones[g]
-            total_cov |= solo_cov
-        score_raw += len(total_cov)
+        score_raw += _get_day_coverage(s, zone_masks)
 
     return score_raw / (min(V, 66) * days)
 
 
-def _get_total_shift_count(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
-) -> list[int]:
+def _get_total_shift_count(shifts: list[list[int]], guards: GuardTable) -> list[int]:
     V = len(guards)
     total_count = [0] * V
     for s in shifts:
@@ -423,9 +414,7 @@ def _get_total_shift_count(
     return total_count
 
 
-def _get_fairness_penalty(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
-) -> int:
+def _get_fairness_penalty(shifts: list[list[int]], guards: GuardTable) -> int:
     total_count = _get_total_shift_count(shifts, guards)
 
     min_count = min(total_count)
@@ -436,7 +425,7 @@ def _get_fairness_penalty(
     return fairness_penalty
 
 
-def _get_swap_list(days: int, rng: r.Random) -> tuple[int, int, int]:
+def _get_swap_list(days: int, rng: r.Random) -> Move:
     d1 = rng.randint(0, days - 1)
     d2 = rng.randint(0, days - 1)
     while d1 == d2:
@@ -447,63 +436,210 @@ def _get_swap_list(days: int, rng: r.Random) -> tuple[int, int, int]:
     return (d1, d2, slot)
 
 
-def _swap(
-    shifts: list[list[int]],
+def _get_weekday_index(
+    guards: GuardTable, days: int
+) -> tuple[list[int], list[list[int]], dict[int, list[int]]]:
+    week = range(1, 8)
+
+    # allowed_mask[idx_g] has bit (weekday - 1) set if the weekday is not forbidden
+    allowed_mask = [0] * len(guards)
+    allowed_weekdays: list[list[int]] = [[] for _ in range(len(guards))]
+    days_by_weekday: dict[int, list[int]] = {d: [] for d in week}
+
+    for idx_d in range(days):
+        days_by_weekday[_day_of_the_week(idx_d + 1)].append(idx_d)
+
+    for idx_g in range(len(guards)):
+        for d in week:
+            if _is_forbidden(guards, idx_g, d) or not days_by_weekday[d]:
+                continue
+            allowed_mask[idx_g] |= 1 << (d - 1)
+            allowed_weekdays[idx_g].append(d)
+
+    return allowed_mask, allowed_weekdays, days_by_weekday
+
+
+def _get_feasible_swap_list(
+    schedule: Schedule,
+    weekday_index: tuple[list[int], list[list[int]], dict[int, list[int]]],
     rng: r.Random,
-) -> list[list[int]]:
+    max_tries: int = 20,
+) -> tuple[Move | None, int]:
+    allowed_mask, allowed_weekdays, days_by_weekday = weekday_index
+    shifts = schedule.shifts
     days = len(shifts)
-    d1, d2, slot = _get_swap_list(days, rng)
 
-    shifts_new = deepcopy(shifts)
-    shifts_new[d1][slot], shifts_new[d2][slot] = (
-        shifts_new[d2][slot],
-        shifts_new[d1][slot],
+    for tries in range(max_tries):
+        d1 = rng.randint(0, days - 1)
+        slot = rng.randint(0, 2)
+        s1 = shifts[d1]
+        idx_g1 = s1[slot]
+
+        # only days whose weekday the first guard may serve
+        weekday_2 = rng.choice(allowed_weekdays[idx_g1])
+        d2 = rng.choice(days_by_weekday[weekday_2])
+        s2 = shifts[d2]
+        idx_g2 = s2[slot]
+
+        if idx_g1 == idx_g2:
+            continue
+        if not allowed_mask[idx_g2] >> (_day_of_the_week(d1 + 1) - 1) & 1:
+            continue
+        if idx_g2 in s1 or idx_g1 in s2:
+            continue
+
+        return (d1, d2, slot), tries
+
+    return None, max_tries
+
+
+def _get_day_coverage(
+    s: list[int],
+    zone_masks: list[int],
+    cov_memo: dict[tuple[int, ...], int] | None = None,
+) -> int:
+    g_d, g_n1, g_n2 = s
+    if cov_memo is None:
+        return (zone_masks[g_d] | zone_masks[g_n1] | zone_masks[g_n2]).bit_count()
+
+    key = tuple(sorted(s))
+    cov = cov_memo.get(key)
+    if cov is None:
+        cov = (zone_masks[g_d] | zone_masks[g_n1] | zone_masks[g_n2]).bit_count()
+        cov_memo[key] = cov
+    return cov
+
+
+def _get_days_score(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int],
+    day_idxs: list[int],
+) -> tuple[int, int]:
+    pref_raw = 0
+    cov_raw = 0
+    for idx_d in day_idxs:
+        weekday = _day_of_the_week(idx_d + 1)
+        for idx_g in shifts[idx_d]:
+            pref_raw += _is_pref(guards, idx_g, weekday)
+        cov_raw += _get_day_coverage(shifts[idx_d], zone_masks)
+    return pref_raw, cov_raw
+
+
+def _get_swap_delta(
+    schedule: Schedule,
+    guards: GuardTable,
+    zone_masks: list[int],
+    move: Move,
+    cov_memo: dict[tuple[int, ...], int] | None = None,
+) -> tuple[bool, int, int, int]:
+    d1, d2, slot = move
+    s1 = schedule.shifts[d1]
+    s2 = schedule.shifts[d2]
+    idx_g1 = s1[slot]
+    idx_g2 = s2[slot]
+
+    if idx_g1 == idx_g2:
+        return True, 0, 0, 0
+
+    # validate hard constraints on the two touched days only
+    if idx_g2 in s1 or idx_g1 in s2:
+        return False, 0, 0, 0
+
+    weekday_1 = _day_of_the_week(d1 + 1)
+    weekday_2 = _day_of_the_week(d2 + 1)
+
+    if _is_forbidden(guards, idx_g2, weekday_1):
+        return False, 0, 0, 0
+    if _is_forbidden(guards, idx_g1, weekday_2):
+        return False, 0, 0, 0
+
+    # preference delta
+    delta_pref = (
+        _is_pref(guards, idx_g2, weekday_1)
+        + _is_pref(guards, idx_g1, weekday_2)
+        - _is_pref(guards, idx_g1, weekday_1)
+        - _is_pref(guards, idx_g2, weekday_2)
     )
 
-    return shifts_new
+    # coverage delta
+    cov_before = _get_day_coverage(s1, zone_masks, cov_memo) + _get_day_coverage(
+        s2, zone_masks, cov_memo
+    )
+    schedule.apply(move)
+    cov_after = _get_day_coverage(s1, zone_masks, cov_memo) + _get_day_coverage(
+        s2, zone_masks, cov_memo
+    )
+    schedule.undo(move)
+    delta_cov = cov_after - cov_before
 
+    # same-slot swap keeps every guard's total count → fairness unchanged
+    delta_penalty = 0
+
+    return True, delta_pref, delta_cov, delta_penalty
 
-def _is_new_schedule_better(
-    guards: dict[int, dict[str, set[int]]],
-    rng: r.Random,
-    shifts_2: list[list[int]],
-    pref_score_1: float,
-    cov_score_1: float,
-    penalty_1: int,
-) -> tuple[bool, float, float, int]:
-    valid = _is_schedule_valid(shifts_2, guards)
 
+def _is_delta_better(
+    rng: r.Random,
+    valid: bool,
+    delta_pref: int,
+    delta_cov: int,
+    delta_penalty: int,
+) -> bool:
     if not valid:
-        return False, pref_score_1, cov_score_1, penalty_1
+        return False
 
-    pref_score_2 = _get_pref_score(shifts_2, guards)
-    cov_score_2 = _get_coverage_score(shifts_2, guards)
-    penalty_2 = _get_fairness_penalty(shifts_2, guards)
+    if delta_pref > 0:
+        return True
+    if delta_pref < 0:
+        return False
+
+    if delta_cov > 0:
+        return True
+    if delta_cov < 0:
+        return False
+
+    if delta_penalty < 0:
+        return True
+    if delta_penalty > 0:
+        return False
 
-    t_tuple = (True, pref_score_2, cov_score_2, penalty_2)
-    f_tuple = (False, pref_score_2, cov_score_2, penalty_2)
+    return rng.random() <= 0.5
 
-    delta_pref = pref_score_2 - pref_score_1
-    if delta_pref > EPS:
-        return t_tuple
-    if delta_pref < -EPS:
-        return f_tuple
 
-    delta_cov = cov_score_2 - cov_score_1
-    if delta_cov > EPS:
-        return t_tuple
-    if delta_cov < -EPS:
-        return f_tuple
+def _get_slot_positions(
+    shifts: list[list[int]], V: int, slots: tuple[int, ...]
+) -> list[list[tuple[int, int]]]:
+    # positions[idx_g] – (idx_d, slot) of every `slots` shift of the guard
+    positions: list[list[tuple[int, int]]] = [[] for _ in range(V)]
+    for idx_d, s in enumerate(shifts):
+        for slot in slots:
+            positions[s[slot]].append((idx_d, slot))
+    return positions
 
-    if penalty_2 < penalty_1:
-        return t_tuple
-    if penalty_2 > penalty_1:
-        return f_tuple
 
-    if rng.random() <= 0.5:
-        return t_tuple
+def _is_replacement_safe(
+    s: list[int],
+    weekday: int,
+    guards: GuardTable,
+    zone_masks: list[int],
+    slot: int,
+    idx_g: int,
+) -> bool:
+    # `idx_g` (allowed on `weekday`) takes over `s[slot]` without lowering
+    # the preference or coverage score
+    if idx_g in s:
+        return False
+    old = s[slot]
+    if _is_pref(guards, idx_g, weekday) < _is_pref(guards, old, weekday):
+        return False
 
-    return f_tuple
+    others = 0
+    for i, g in enumerate(s):
+        if i != slot:
+            others |= zone_masks[g]
+    cov_new = (others | zone_masks[idx_g]).bit_count()
+    return cov_new >= (others | zone_masks[old]).bit_count()
 
 
 def _get_night_count(shifts: list[list[int]], V: int) -> list[int]:
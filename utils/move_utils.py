@@ -0,0 +1,221 @@
+import random as r
+from typing import Literal
+
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _day_of_the_week,
+    _get_day_coverage,
+    _get_feasible_swap_list,
+    _get_swap_delta,
+    _is_pref,
+)
+from utils.schedule_utils import Schedule, ShiftCounts
+
+MoveKind = Literal["swap", "exchange", "replace", "rotate"]
+MOVE_KINDS: tuple[MoveKind, ...] = ("swap", "exchange", "replace", "rotate")
+
+# (kind, args):
+#   swap     (d1, d2, slot)       – the slot of two days is exchanged
+#   exchange (d, slot)            – day guard ↔ night guard in `slot` on day d
+#   replace  (d, slot, idx_g)     – a less loaded guard takes over the slot
+#   rotate   (d1, d2, d3, slot)   – the slot's guards move d1 → d2 → d3 → d1
+Neighbour = tuple[MoveKind, tuple[int, ...]]
+
+DEFAULT_MOVES: dict[MoveKind, float] = {"swap": 1.0}
+
+
+class Neighbourhood:
+    # samples only feasible moves, so `delta` skips the hard constraints of
+    # everything but swaps (validated by `_get_swap_delta` as before)
+    __slots__ = (
+        "schedule",
+        "guards",
+        "zone_masks",
+        "weekday_index",
+        "guards_by_weekday",
+        "counts",
+        "kinds",
+        "weights",
+        "cov_memo",
+        "max_tries",
+    )
+
+    def __init__(
+        self,
+        schedule: Schedule,
+        guards: GuardTable,
+        zone_masks: list[int],
+        weekday_index: tuple[list[int], list[list[int]], dict[int, list[int]]],
+        moves: dict[MoveKind, float] | None = None,
+        cov_memo: dict[tuple[int, ...], int] | None = None,
+        max_tries: int = 20,
+    ) -> None:
+        if moves is None:
+            moves = DEFAULT_MOVES
+        self.schedule = schedule
+        self.guards = guards
+        self.zone_masks = zone_masks
+        self.weekday_index = weekday_index
+        self.cov_memo = cov_memo
+        self.max_tries = max_tries
+
+        self.kinds = [kind for kind, p in moves.items() if p > 0]
+        self.weights = [moves[kind] for kind in self.kinds]
+        if not self.kinds:
+            raise ValueError("at least one move type needs a positive probability")
+
+        _, allowed_weekdays, _ = weekday_index
+        self.guards_by_weekday: dict[int, list[int]] = {d: [] for d in range(1, 8)}
+        for idx_g, weekdays in enumerate(allowed_weekdays):
+            for d in weekdays:
+                self.guards_by_weekday[d].append(idx_g)
+        self.counts = ShiftCounts(schedule.shifts, len(guards))
+
+    def sample(self, rng: r.Random) -> tuple[Neighbour | None, int]:
+        # a single move type keeps the random stream of the plain swap sampler
+        kind = self.kinds[0]
+        if len(self.kinds) > 1:
+            kind = rng.choices(self.kinds, self.weights)[0]
+
+        if kind == "swap":
+            move, tries = _get_feasible_swap_list(
+                self.schedule, self.weekday_index, rng, self.max_tries
+            )
+            return (None, tries) if move is None else (("swap", move), tries)
+
+        sample = {
+            "exchange": self._sample_exchange,
+            "replace": self._sample_replace,
+            "rotate": self._sample_rotate,
+        }[kind]
+        for tries in range(self.max_tries):
+            args = sample(rng)
+            if args is not None:
+                return (kind, args), tries
+        return None, self.max_tries
+
+    def _sample_exchange(self, rng: r.Random) -> tuple[int, ...] | None:
+        # only if neither the day nor the night counts get less even
+        d = rng.randint(0, len(self.schedule) - 1)
+        slot = rng.randint(1, 2)
+        g_day, g_night = self.schedule.shifts[d][0], self.schedule.shifts[d][slot]
+        counts = self.counts
+        if counts.day[g_day] <= counts.day[g_night]:
+            return None
+        if counts.night[g_night] <= counts.night[g_day]:
+            return None
+        return (d, slot)
+
+    def _sample_replace(self, rng: r.Random) -> tuple[int, ...] | None:
+        # the new guard has fewer shifts in total and of the slot's kind
+        d = rng.randint(0, len(self.schedule) - 1)
+        slot = rng.randint(0, 2)
+        s = self.schedule.shifts[d]
+        g_old = s[slot]
+        g_new = rng.choice(self.guards_by_weekday[_day_of_the_week(d + 1)])
+        if g_new in s:
+            return None
+        counts = self.counts
+        kind = counts.day if slot == 0 else counts.night
+        if counts.total[g_new] >= counts.total[g_old] or kind[g_new] >= kind[g_old]:
+            return None
+        return (d, slot, g_new)
+
+    def _sample_rotate(self, rng: r.Random) -> tuple[int, ...] | None:
+        # each guard lands on a day of a weekday it may serve
+        allowed_mask, allowed_weekdays, days_by_weekday = self.weekday_index
+        shifts = self.schedule.shifts
+        d1 = rng.randint(0, len(shifts) - 1)
+        slot = rng.randint(0, 2)
+        g1 = shifts[d1][slot]
+        d2 = rng.choice(days_by_weekday[rng.choice(allowed_weekdays[g1])])
+        g2 = shifts[d2][slot]
+        d3 = rng.choice(days_by_weekday[rng.choice(allowed_weekdays[g2])])
+        g3 = shifts[d3][slot]
+
+        if d1 == d2 or d2 == d3 or d1 == d3:
+            return None
+        if not allowed_mask[g3] >> (_day_of_the_week(d1 + 1) - 1) & 1:
+            return None
+        if g1 in shifts[d2] or g2 in shifts[d3] or g3 in shifts[d1]:
+            return None
+        return (d1, d2, d3, slot)
+
+    def delta(self, move: Neighbour) -> tuple[bool, int, int, int]:
+        kind, args = move
+        if kind == "swap":
+            return _get_swap_delta(
+                self.schedule, self.guards, self.zone_masks, args, self.cov_memo
+            )
+        if kind == "exchange":
+            # same guards on the same day, same totals
+            return True, 0, 0, 0
+        if kind == "replace":
+            return self._replace_delta(*args)
+        return self._rotate_delta(*args)
+
+    def _replace_delta(
+        self, d: int, slot: int, g_new: int
+    ) -> tuple[bool, int, int, int]:
+        s = self.schedule.shifts[d]
+        g_old = s[slot]
+        weekday = _day_of_the_week(d + 1)
+        d_pref = _is_pref(self.guards, g_new, weekday) - _is_pref(
+            self.guards, g_old, weekday
+        )
+
+        cov_before = _get_day_coverage(s, self.zone_masks, self.cov_memo)
+        s[slot] = g_new
+        cov_after = _get_day_coverage(s, self.zone_masks, self.cov_memo)
+        s[slot] = g_old
+
+        counts = self.counts
+        pen_before = counts.penalty()
+        counts.hand_over(g_old, g_new, slot)
+        pen_after = counts.penalty()
+        counts.hand_over(g_new, g_old, slot)
+
+        return True, d_pref, cov_after - cov_before, pen_after - pen_before
+
+    def _rotate_delta(
+        self, d1: int, d2: int, d3: int, slot: int
+    ) -> tuple[bool, int, int, int]:
+        shifts = self.schedule.shifts
+        days = (d1, d2, d3)
+
+        d_pref = 0
+        cov_before = 0
+        for d in days:
+            d_pref -= _is_pref(self.guards, shifts[d][slot], _day_of_the_week(d + 1))
+            cov_before += _get_day_coverage(shifts[d], self.zone_masks, self.cov_memo)
+
+        self._rotate(d1, d2, d3, slot)
+        cov_after = 0
+        for d in days:
+            d_pref += _is_pref(self.guards, shifts[d][slot], _day_of_the_week(d + 1))
+            cov_after += _get_day_coverage(shifts[d], self.zone_masks, self.cov_memo)
+        self._rotate(d3, d2, d1, slot)
+
+        # same slot on every day → per-guard counts unchanged
+        return True, d_pref, cov_after - cov_before, 0
+
+    def _rotate(self, d1: int, d2: int, d3: int, slot: int) -> None:
+        s1, s2, s3 = (self.schedule.shifts[d] for d in (d1, d2, d3))
+        s1[slot], s2[slot], s3[slot] = s3[slot], s1[slot], s2[slot]
+
+    def apply(self, move: Neighbour) -> None:
+        kind, args = move
+        if kind == "swap":
+            self.schedule.apply(args)
+        elif kind == "exchange":
+            d, slot = args
+            s = self.schedule.shifts[d]
+            self.counts.exchange(s[0], s[slot])
+            s[0], s[slot] = s[slot], s[0]
+        elif kind == "replace":
+            d, slot, g_new = args
+            s = self.schedule.shifts[d]
+            self.counts.hand_over(s[slot], g_new, slot)
+            s[slot] = g_new
+        else:
+            self._rotate(*args)
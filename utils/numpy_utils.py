@@ -0,0 +1,119 @@
+from typing import Literal
+
+from utils.guard_utils import GuardTable
+from utils.helpers import _get_zones
+
+Backend = Literal["python", "numpy"]
+
+# optional backend, see `numpy` extra in pyproject.toml; imported on first use
+# so runs with the python backend do not pay for it
+np = None
+
+
+def _require_numpy() -> None:
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "numpy backend requested but numpy is not installed "
+            "(install the `numpy` extra)"
+        ) from None
+    np = numpy
+
+
+def _get_guard_arrays(
+    guards: GuardTable,
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    _require_numpy()
+    V = len(guards)
+
+    # prefs[g, w] / forbiddens[g, w] – 0-based guard, 0-based weekday (0 = Monday)
+    bits = np.arange(7, dtype=np.uint8)
+    prefs = (np.frombuffer(guards.prefs, dtype=np.uint8)[:, None] >> bits & 1) > 0
+    forbiddens = (
+        np.frombuffer(guards.forbiddens, dtype=np.uint8)[:, None] >> bits & 1
+    ) > 0
+    # zones[g, z] – guard g covers garden z (both 0-based)
+    zones = np.zeros((V, V), dtype=bool)
+
+    for idx_g, zone in enumerate(_get_zones(guards)):
+        zones[idx_g, list(zone)] = True
+
+    return prefs, forbiddens, zones
+
+
+def _to_array(shifts: list[list[int]]) -> "np.ndarray":
+    _require_numpy()
+    return np.asarray(shifts, dtype=np.int64).reshape(-1, 3)
+
+
+def _get_weekdays(days: int) -> "np.ndarray":
+    # same as `_day_of_the_week(idx_d + 1) - 1`
+    return np.arange(days) % 7
+
+
+def _np_is_schedule_valid(shifts: "np.ndarray", forbiddens: "np.ndarray") -> bool:
+    V = forbiddens.shape[0]
+
+    if shifts.ndim != 2 or shifts.shape[1] != 3:
+        return False
+    if shifts.size == 0:
+        return True
+
+    # validate guards' indexes (also rejects unassigned -1)
+    if shifts.min() < 0 or shifts.max() >= V:
+        return False
+
+    # validate hard constraint 2 (different guard for every shift position)
+    d, n1, n2 = shifts[:, 0], shifts[:, 1], shifts[:, 2]
+    if np.any((d == n1) | (d == n2) | (n1 == n2)):
+        return False
+
+    # validate hard constraint 1 (weekday is not forbidden for a guard)
+    weekdays = _get_weekdays(shifts.shape[0])
+    return not forbiddens[shifts, weekdays[:, None]].any()
+
+
+def _np_get_pref_score(shifts: "np.ndarray", prefs: "np.ndarray") -> float:
+    days = shifts.shape[0]
+    weekdays = _get_weekdays(days)
+    score_raw = int(prefs[shifts, weekdays[:, None]].sum())
+    return score_raw / (days * 3)
+
+
+def _np_get_coverage_score(shifts: "np.ndarray", zones: "np.ndarray") -> float:
+    V = zones.shape[0]
+    days = shifts.shape[0]
+    total_cov = zones[shifts[:, 0]] | zones[shifts[:, 1]] | zones[shifts[:, 2]]
+    score_raw = int(total_cov.sum())
+    return score_raw / (min(V, 66) * days)
+
+
+def _np_get_total_shift_count(shifts: "np.ndarray", V: int) -> "np.ndarray":
+    return np.bincount(shifts.ravel(), minlength=V)
+
+
+def _np_fairness_penalty_and_min_max(
+    shifts: "np.ndarray", V: int
+) -> tuple[int, int, int]:
+    total_count = _np_get_total_shift_count(shifts, V)
+
+    min_count = int(total_count.min())
+    max_count = int(total_count.max())
+
+    fairness_penalty = max(0, max_count - min_count - 1)
+
+    return fairness_penalty, min_count, max_count
+
+
+def _np_daynight_quantity(shifts: "np.ndarray", V: int) -> tuple[list[int], list[int]]:
+    day_count = np.bincount(shifts[:, 0], minlength=V)
+    night_count = np.bincount(shifts[:, 1:].ravel(), minlength=V)
+
+    day = np.bincount(day_count).tolist()
+    night = np.bincount(night_count).tolist()
+
+    return day, night
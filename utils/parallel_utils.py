@@ -0,0 +1,306 @@
+import math
+import os
+import random as r
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+
+from utils.algo_utils import (
+    get_quotas_and_days_sorted,
+    init_solution,
+    repair_fairness,
+)
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _get_coverage_score,
+    _get_days_score,
+    _get_fairness_penalty,
+    _get_pref_score,
+    _get_weekday_index,
+    _get_zone_masks,
+)
+from utils.move_utils import MoveKind
+from utils.schedule_utils import Schedule
+from utils.search_utils import (
+    DEFAULT_MAX_ITER,
+    Engine,
+    _get_objective_weights,
+    _run_metropolis,
+    run_engine,
+)
+from utils.seed_utils import derive_seed, spawn_rng
+
+# default temperature ladder ends, same range as `anneal_schedule`
+PT_T_MIN = 0.3
+PT_T_MAX = 6.0
+
+# per-start keys of `_run_start` that are not search telemetry
+START_SUMMARY_KEYS = ("pid", "pref", "cov", "penalty", "time")
+START_SUMMED_KEYS = ("iterations", "accepted", "improved")
+
+# per-process instance state, filled once by `_init_worker`
+_worker_state: dict = {}
+
+
+def _init_worker(
+    guards: GuardTable,
+    days: int,
+    shifts_init: list[list[int]] | None,
+) -> None:
+    quotas, available = get_quotas_and_days_sorted(guards, days)
+    _worker_state["guards"] = guards
+    _worker_state["shifts_init"] = shifts_init
+    _worker_state["quotas"] = quotas
+    _worker_state["available"] = available
+    _worker_state["zone_masks"] = _get_zone_masks(guards)
+    _worker_state["weekday_index"] = _get_weekday_index(guards, days)
+
+
+def _run_start(
+    seed: int,
+    max_iter: int | None,
+    engine: Engine,
+    time_budget: float | None,
+    stagnation: int | None,
+    upper_bound: tuple[int, int] | None,
+    moves: dict[MoveKind, float] | None,
+) -> tuple[list[list[int]], dict]:
+    t1 = perf_counter()
+
+    guards = _worker_state["guards"]
+    zone_masks = _worker_state["zone_masks"]
+    rng = r.Random(seed)
+    stats: dict = {}
+
+    shifts = _worker_state["shifts_init"]
+    if shifts is None:
+        shifts = init_solution(
+            guards, _worker_state["available"], _worker_state["quotas"]
+        )
+    shifts = run_engine(
+        shifts,
+        guards,
+        rng,
+        engine,
+        max_iter,
+        time_budget,
+        zone_masks,
+        stats,
+        stagnation,
+        upper_bound,
+        moves,
+    )
+    shifts = repair_fairness(shifts, guards, zone_masks)
+
+    stats["seed"] = seed
+    stats["pid"] = os.getpid()
+    stats["pref"] = _get_pref_score(shifts, guards)
+    stats["cov"] = _get_coverage_score(shifts, guards, zone_masks)
+    stats["penalty"] = _get_fairness_penalty(shifts, guards)
+    stats["time"] = perf_counter() - t1
+
+    return shifts, stats
+
+
+def multi_start(
+    guards: GuardTable,
+    days: int,
+    seeds: list[int],
+    max_iter: int | None,
+    workers: int | None = None,
+    engine: Engine = "hill",
+    time_budget: float | None = None,
+    shifts_init: list[list[int]] | None = None,
+    stagnation: int | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    moves: dict[MoveKind, float] | None = None,
+    stats: dict | None = None,
+) -> tuple[list[list[int]], list[dict]]:
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(guards, days, shifts_init),
+    ) as pool:
+        results = list(
+            pool.map(
+                _run_start,
+                seeds,
+                repeat(max_iter),
+                repeat(engine),
+                repeat(time_budget),
+                repeat(stagnation),
+                repeat(upper_bound),
+                repeat(moves),
+            )
+        )
+
+    # lexicographic: pref ↑, coverage ↑, fairness penalty ↓; first seed wins ties
+    best_shifts, best_stats = results[0]
+    for shifts, st in results[1:]:
+        key = (st["pref"], st["cov"], -st["penalty"])
+        best_key = (best_stats["pref"], best_stats["cov"], -best_stats["penalty"])
+        if key > best_key:
+            best_shifts, best_stats = shifts, st
+
+    # search telemetry: counters summed over the starts, the rest (outcome
+    # split, stop reason, trajectory) from the winning start
+    if stats is not None:
+        for key, value in best_stats.items():
+            if key not in START_SUMMARY_KEYS:
+                stats[key] = value
+        for key in START_SUMMED_KEYS:
+            stats[key] = sum(st.get(key, 0) for _, st in results)
+
+    return best_shifts, [st for _, st in results]
+
+
+def _get_score_key(
+    shifts: list[list[int]], guards: GuardTable, zone_masks: list[int]
+) -> tuple[int, int, int]:
+    pref_raw, cov_raw = _get_days_score(
+        shifts, guards, zone_masks, list(range(len(shifts)))
+    )
+    return pref_raw, cov_raw, -_get_fairness_penalty(shifts, guards)
+
+
+def _run_chain(
+    state: bytes,
+    temp: float,
+    seed: int,
+    steps: int,
+    moves: dict[MoveKind, float] | None,
+) -> tuple[bytes, tuple[int, int, int], bytes | None, tuple[int, int, int], int]:
+    guards = _worker_state["guards"]
+    zone_masks = _worker_state["zone_masks"]
+
+    schedule = Schedule.from_bytes(state)
+    start_key = _get_score_key(schedule.shifts, guards, zone_masks)
+    (d_pref, d_cov, d_pen), best_delta, best, accepted = _run_metropolis(
+        schedule,
+        guards,
+        r.Random(seed),
+        temp,
+        steps,
+        zone_masks,
+        _worker_state["weekday_index"],
+        moves,
+    )
+
+    pref, cov, neg_pen = start_key
+    key = (pref + d_pref, cov + d_cov, neg_pen - d_pen)
+    best_key = tuple(a + b for a, b in zip(start_key, best_delta))
+    best_state = None if best is None else Schedule(best).to_bytes()
+
+    return schedule.to_bytes(), key, best_state, best_key, accepted
+
+
+def get_temperature_ladder(
+    chains: int, t_min: float = PT_T_MIN, t_max: float = PT_T_MAX
+) -> list[float]:
+    # geometric spacing gives roughly even exchange rates between neighbours
+    if chains == 1:
+        return [t_min]
+    return [t_min * (t_max / t_min) ** (i / (chains - 1)) for i in range(chains)]
+
+
+def parallel_tempering(
+    guards: GuardTable,
+    days: int,
+    shifts_init: list[list[int]],
+    seed: int,
+    max_iter: int | None,
+    chains: int = 4,
+    temps: list[float] | None = None,
+    exchange_interval: int = 500,
+    workers: int | None = None,
+    time_budget: float | None = None,
+    stats: dict | None = None,
+    moves: dict[MoveKind, float] | None = None,
+) -> list[list[int]]:
+    t_begin = perf_counter()
+    if max_iter is None and time_budget is None:
+        max_iter = DEFAULT_MAX_ITER
+    if temps is None:
+        temps = get_temperature_ladder(chains)
+    temps = sorted(temps)
+    chains = len(temps)
+    pref_weight, cov_weight = _get_objective_weights(len(guards))
+
+    def energy(key: tuple[int, int, int]) -> int:
+        pref, cov, neg_pen = key
+        return pref_weight * pref + cov_weight * cov + neg_pen
+
+    # streams: "exchange" for the acceptance draws, "chain/<i>/<round>" for
+    # chain i (always at temps[i]) in each round – independent of the pool
+    rng = spawn_rng(seed, "exchange")
+
+    # replicas travel as compact byte strings
+    best = Schedule(shifts_init).to_bytes()
+    best_key = _get_score_key(shifts_init, guards, _get_zone_masks(guards))
+    states = [best] * chains
+    keys = [best_key] * chains
+
+    attempts = [0] * (chains - 1)
+    exchanges = [0] * (chains - 1)
+    accepted = [0] * chains
+    steps_done = 0
+    rounds = 0
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(guards, days, None),
+    ) as pool:
+        while True:
+            # the same limits as `run_engine`, counted in steps per chain
+            if time_budget is not None and perf_counter() - t_begin >= time_budget:
+                break
+            steps = exchange_interval
+            if max_iter is not None:
+                steps = min(steps, max_iter - steps_done)
+                if steps <= 0:
+                    break
+
+            seeds = [derive_seed(seed, "chain", i, rounds) for i in range(chains)]
+            results = list(
+                pool.map(_run_chain, states, temps, seeds, repeat(steps), repeat(moves))
+            )
+            steps_done += steps
+
+            for i, (state, key, best_state, chain_best_key, acc) in enumerate(results):
+                states[i] = state
+                keys[i] = key
+                accepted[i] += acc
+                if best_state is not None and chain_best_key > best_key:
+                    best = best_state
+                    best_key = chain_best_key
+
+            # replica exchange between neighbours, even and odd pairs in turn
+            for i in range(rounds % 2, chains - 1, 2):
+                attempts[i] += 1
+                delta = (energy(keys[i + 1]) - energy(keys[i])) * (
+                    1 / temps[i] - 1 / temps[i + 1]
+                )
+                if delta >= 0 or rng.random() < math.exp(delta):
+                    states[i], states[i + 1] = states[i + 1], states[i]
+                    keys[i], keys[i + 1] = keys[i + 1], keys[i]
+                    exchanges[i] += 1
+            rounds += 1
+
+    if stats is not None:
+        stats["chains"] = chains
+        stats["seed"] = seed
+        stats["temps"] = temps
+        stats["exchange_interval"] = exchange_interval
+        stats["rounds"] = rounds
+        stats["iterations"] = steps_done * chains
+        stats["accepted"] = sum(accepted)
+        stats["chain_accepted"] = accepted
+        stats["exchange_attempts"] = attempts
+        stats["exchange_accepted"] = exchanges
+        stats["exchange_rate"] = [
+            e / a if a else 0.0 for a, e in zip(attempts, exchanges)
+        ]
+        stats["state_bytes"] = len(best)
+
+    return Schedule.from_bytes(best).shifts
@@ -1,9 +1,21 @@
+from utils.guard_utils import GuardTable
 from utils.helpers import _get_total_shift_count
+from utils.numpy_utils import (
+    Backend,
+    _np_daynight_quantity,
+    _np_fairness_penalty_and_min_max,
+    _to_array,
+)
 
 
 def _fairness_penalty_and_min_max(
-    shifts: list[list[int]], guards: dict[int, dict[str, set[int]]]
+    shifts: list[list[int]],
+    guards: GuardTable,
+    backend: Backend = "python",
 ) -> tuple[int, int, int]:
+    if backend == "numpy":
+        return _np_fairness_penalty_and_min_max(_to_array(shifts), len(guards))
+
     total_count = _get_total_shift_count(shifts, guards)
 
     min_count = min(total_count)
@@ -16,8 +28,12 @@ def _fairness_penalty_and_min_max(
 
 def _daynight_quantity(
     shifts: list[list[int]],
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
+    backend: Backend = "python",
 ) -> tuple[list[int], list[int]]:
+    if backend == "numpy":
+        return _np_daynight_quantity(_to_array(shifts), len(guards))
+
     shift_count = [[0, 0] for _ in range(len(guards))]
 
     for d, n1, n2 in shifts:
@@ -40,9 +56,10 @@ def _daynight_quantity(
 
 def _print_daynight_quantity(
     shifts: list[list[int]],
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
+    backend: Backend = "python",
 ) -> None:
-    day, night = _daynight_quantity(shifts, guards)
+    day, night = _daynight_quantity(shifts, guards, backend)
     for d, q in enumerate(day):
         if q != 0:
             print(f"      → {d} dayshifts: {q} guards")
@@ -53,7 +70,7 @@ def _print_daynight_quantity(
 
 
 def print_result(
-    guards: dict[int, dict[str, set[int]]],
+    guards: GuardTable,
     shifts_1: list[list[int]],
     shifts_2: list[list[int]],
     t_d: float,
@@ -64,14 +81,19 @@ def print_result(
     pen1: int,
     pen2: int,
     only_results: bool = True,
+    backend: Backend = "python",
 ) -> None:
     pref_perc = round((pref2 - pref1) / (pref1 / 100), 3)
     pref_res = f"+{pref_perc}%" if pref_perc >= 0 else f"{pref_perc}%"
     cov_perc = round((cov2 - cov1) / (cov1 / 100), 3)
     cov_res = f"+{cov_perc}%" if cov_perc >= 0 else f"{cov_perc}%"
     pen_delta = pen2 - pen1
-    _, min_count_1, max_count_1 = _fairness_penalty_and_min_max(shifts_1, guards)
-    _, min_count_2, max_count_2 = _fairness_penalty_and_min_max(shifts_2, guards)
+    _, min_count_1, max_count_1 = _fairness_penalty_and_min_max(
+        shifts_1, guards, backend
+    )
+    _, min_count_2, max_count_2 = _fairness_penalty_and_min_max(
+        shifts_2, guards, backend
+    )
 
     if not only_results:
         # inital schedule
@@ -97,5 +119,54 @@ def print_result(
     print(
         f" • Fairness penalty: {pen1} → {pen2} (Δ = {pen_delta}), S_min = {min_count_2}, S_max = {max_count_2}"
     )
-    _print_daynight_quantity(shifts_2, guards)
+    _print_daynight_quantity(shifts_2, guards, backend)
     print(f"   • Time taken: {t_d:.4f} s")
+
+
+def print_start_stats(start_stats: list[dict]) -> None:
+    print("\n---------- STARTS ----------\n")
+    for st in start_stats:
+        print(
+            f" • seed {st['seed']} (pid {st['pid']}): "
+            f"PrefScore {st['pref']:.4f}, CoverageScore {st['cov']:.4f}, "
+            f"penalty {st['penalty']}, accepted {st['accepted']}/"
+            f"{st['iterations']}, {st['time']:.4f} s"
+        )
+
+
+def print_block_stats(block_stats: list[dict]) -> None:
+    print("\n---------- BLOCKS ----------\n")
+    for st in block_stats:
+        print(
+            f" • days {st['start'] + 1}–{st['start'] + st['days']} "
+            f"(pid {st['pid']}): PrefScore {st['pref']:.4f}, "
+            f"CoverageScore {st['cov']:.4f}, penalty {st['penalty']}, "
+            f"accepted {st['accepted']}/{st['iterations']}, {st['time']:.4f} s"
+        )
+
+
+def print_tempering_stats(stats: dict) -> None:
+    print("\n---------- TEMPERING ----------\n")
+    print(
+        f" • {stats['chains']} chains, {stats['rounds']} rounds of "
+        f"{stats['exchange_interval']} steps, accepted {stats['accepted']}/"
+        f"{stats['iterations']}"
+    )
+    temps = stats["temps"]
+    for i, rate in enumerate(stats["exchange_rate"]):
+        print(
+            f" • T {temps[i]:.3f} ↔ {temps[i + 1]:.3f}: exchanged "
+            f"{stats['exchange_accepted'][i]}/{stats['exchange_attempts'][i]} "
+            f"({rate:.1%})"
+        )
+
+
+def print_replan_stats(stats: dict) -> None:
+    print("\n---------- REPLAN ----------\n")
+    print(f" • changed guards: {stats['changed_guards']}")
+    print(
+        f" • infeasible slots: {stats['broken_slots']} "
+        f"(unrepaired: {stats['unrepaired']})"
+    )
+    print(f" • re-optimized days: {stats['touched_days']}")
+    print(f" • changed slots vs. previous roster: {stats['moved_slots']}")
@@ -0,0 +1,176 @@
+import random as r
+
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _day_of_the_week,
+    _get_swap_delta,
+    _get_weekday_index,
+    _get_zone_masks,
+    _is_forbidden,
+    _is_pref,
+)
+from utils.schedule_utils import Schedule
+
+REPLAN_ITER = 500
+
+
+def _diff_guards(guards_old: GuardTable, guards_new: GuardTable) -> set[int]:
+    changed: set[int] = set()
+    for idx_g in range(len(guards_new)):
+        if (
+            guards_old.prefs[idx_g] != guards_new.prefs[idx_g]
+            or guards_old.forbiddens[idx_g] != guards_new.forbiddens[idx_g]
+        ):
+            changed.add(idx_g)
+    return changed
+
+
+def _get_broken_slots(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    changed: set[int],
+) -> list[tuple[int, int]]:
+    # only guards whose input changed can have become infeasible
+    broken: list[tuple[int, int]] = []
+    for idx_d, s in enumerate(shifts):
+        weekday = _day_of_the_week(idx_d + 1)
+        for slot, idx_g in enumerate(s):
+            if idx_g in changed and _is_forbidden(guards, idx_g, weekday):
+                broken.append((idx_d, slot))
+    return broken
+
+
+def _repair_slot(
+    schedule: Schedule,
+    guards: GuardTable,
+    zone_masks: list[int],
+    weekday_index: tuple[list[int], list[list[int]], dict[int, list[int]]],
+    idx_d: int,
+    slot: int,
+) -> int | None:
+    _, allowed_weekdays, days_by_weekday = weekday_index
+    shifts = schedule.shifts
+    idx_g = shifts[idx_d][slot]
+
+    # 1) swap the slot with another day – keeps every guard's counts
+    best_d2: int | None = None
+    best_key: tuple[int, int] | None = None
+    for weekday in allowed_weekdays[idx_g]:
+        for d2 in days_by_weekday[weekday]:
+            valid, d_pref, d_cov, _ = _get_swap_delta(
+                schedule, guards, zone_masks, (idx_d, d2, slot)
+            )
+            if not valid or shifts[d2][slot] == idx_g:
+                continue
+            if best_key is None or (d_pref, d_cov) > best_key:
+                best_d2 = d2
+                best_key = (d_pref, d_cov)
+
+    if best_d2 is not None:
+        schedule.apply((idx_d, best_d2, slot))
+        return best_d2
+
+    # 2) replace with the least loaded allowed guard not serving that day
+    weekday = _day_of_the_week(idx_d + 1)
+    total_count = [0] * len(guards)
+    for s in shifts:
+        for g in s:
+            total_count[g] += 1
+
+    best_g: int | None = None
+    best_rank: tuple[int, int, int] | None = None
+    for candidate in range(len(guards)):
+        if _is_forbidden(guards, candidate, weekday) or candidate in shifts[idx_d]:
+            continue
+        rank = (
+            total_count[candidate],
+            -_is_pref(guards, candidate, weekday),
+            candidate,
+        )
+        if best_rank is None or rank < best_rank:
+            best_g = candidate
+            best_rank = rank
+
+    if best_g is None:
+        return None
+    shifts[idx_d][slot] = best_g
+    return idx_d
+
+
+def replan_schedule(
+    shifts_old: list[list[int]],
+    guards_old: GuardTable,
+    guards_new: GuardTable,
+    rng: r.Random,
+    max_iter: int = REPLAN_ITER,
+    zone_masks: list[int] | None = None,
+    stats: dict | None = None,
+) -> list[list[int]] | None:
+    # guards are matched by line number, a different count needs a new plan
+    if len(guards_old) != len(guards_new):
+        return None
+
+    schedule = Schedule(shifts_old)
+    shifts = schedule.shifts
+    days = len(schedule)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards_new)
+    weekday_index = _get_weekday_index(guards_new, days)
+    _, allowed_weekdays, days_by_weekday = weekday_index
+
+    changed = _diff_guards(guards_old, guards_new)
+    broken = _get_broken_slots(shifts, guards_new, changed)
+
+    # repair infeasible slots
+    touched: set[int] = set()
+    unrepaired = 0
+    for idx_d, slot in broken:
+        weekday = _day_of_the_week(idx_d + 1)
+        if not _is_forbidden(guards_new, shifts[idx_d][slot], weekday):
+            continue  # already fixed by an earlier swap
+        other = _repair_slot(
+            schedule, guards_new, zone_masks, weekday_index, idx_d, slot
+        )
+        if other is None:
+            unrepaired += 1
+            continue
+        touched.update((idx_d, other))
+
+    # days of changed guards may now score differently (e.g. new prefs)
+    for idx_d, s in enumerate(shifts):
+        if changed.intersection(s):
+            touched.add(idx_d)
+
+    # local re-optimization: only strict improvements of moves that touch the
+    # repaired days, so the published roster changes as little as possible
+    local_days = sorted(touched)
+    accepted = 0
+    if local_days:
+        for _ in range(max_iter):
+            d1 = rng.choice(local_days)
+            slot = rng.randint(0, 2)
+            weekday_2 = rng.choice(allowed_weekdays[shifts[d1][slot]])
+            d2 = rng.choice(days_by_weekday[weekday_2])
+            move = (d1, d2, slot)
+
+            valid, d_pref, d_cov, d_pen = _get_swap_delta(
+                schedule, guards_new, zone_masks, move
+            )
+            if not valid or (d_pref, d_cov, -d_pen) <= (0, 0, 0):
+                continue
+            schedule.apply(move)
+            accepted += 1
+
+    if stats is not None:
+        stats["changed_guards"] = len(changed)
+        stats["broken_slots"] = len(broken)
+        stats["unrepaired"] = unrepaired
+        stats["touched_days"] = len(local_days)
+        stats["accepted"] = accepted
+        stats["moved_slots"] = sum(
+            a != b
+            for s_old, s_new in zip(shifts_old, shifts)
+            for a, b in zip(s_old, s_new)
+        )
+
+    return shifts
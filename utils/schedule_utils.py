@@ -0,0 +1,93 @@
+from array import array
+
+# (d1, d2, slot) – guards in `slot` of days d1 and d2 are exchanged
+Move = tuple[int, int, int]
+
+
+class Schedule:
+    __slots__ = ("shifts",)
+
+    def __init__(self, shifts: list[list[int]]) -> None:
+        self.shifts = [s.copy() for s in shifts]
+
+    def __len__(self) -> int:
+        return len(self.shifts)
+
+    def apply(self, move: Move) -> None:
+        d1, d2, slot = move
+        s1 = self.shifts[d1]
+        s2 = self.shifts[d2]
+        s1[slot], s2[slot] = s2[slot], s1[slot]
+
+    def undo(self, move: Move) -> None:
+        # a swap is its own inverse
+        self.apply(move)
+
+    def to_list(self) -> list[list[int]]:
+        return [s.copy() for s in self.shifts]
+
+    def to_bytes(self) -> bytes:
+        # flat int32 rows, 12 bytes per day – cheap to send between processes
+        return array("i", [g for s in self.shifts for g in s]).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Schedule":
+        flat = array("i")
+        flat.frombytes(data)
+        schedule = cls.__new__(cls)
+        schedule.shifts = [flat[i : i + 3].tolist() for i in range(0, len(flat), 3)]
+        return schedule
+
+
+class ShiftCounts:
+    # day / night / total shifts per guard plus a histogram of the totals, so
+    # the fairness penalty is read and updated in O(1)
+    __slots__ = ("day", "night", "total", "freq", "lo", "hi")
+
+    def __init__(self, shifts: list[list[int]], V: int) -> None:
+        self.day = [0] * V
+        self.night = [0] * V
+        for g_d, g_n1, g_n2 in shifts:
+            self.day[g_d] += 1
+            self.night[g_n1] += 1
+            self.night[g_n2] += 1
+        self.total = [d + n for d, n in zip(self.day, self.night)]
+
+        # a guard serves at most once a day
+        self.freq = [0] * (len(shifts) + 2)
+        for t in self.total:
+            self.freq[t] += 1
+        self.lo = min(self.total)
+        self.hi = max(self.total)
+
+    def penalty(self) -> int:
+        return max(0, self.hi - self.lo - 1)
+
+    def hand_over(self, idx_g_old: int, idx_g_new: int, slot: int) -> None:
+        kind = self.day if slot == 0 else self.night
+        kind[idx_g_old] -= 1
+        kind[idx_g_new] += 1
+        self._add_total(idx_g_old, -1)
+        self._add_total(idx_g_new, 1)
+
+    def exchange(self, idx_g_day: int, idx_g_night: int) -> None:
+        # same day: the day guard takes the night shift and vice versa
+        self.day[idx_g_day] -= 1
+        self.night[idx_g_day] += 1
+        self.day[idx_g_night] += 1
+        self.night[idx_g_night] -= 1
+
+    def _add_total(self, idx_g: int, step: int) -> None:
+        freq = self.freq
+        t = self.total[idx_g]
+        freq[t] -= 1
+        t += step
+        freq[t] += 1
+        self.total[idx_g] = t
+
+        self.hi = max(self.hi, t)
+        self.lo = min(self.lo, t)
+        while not freq[self.hi]:
+            self.hi -= 1
+        while not freq[self.lo]:
+            self.lo += 1
@@ -0,0 +1,695 @@
+import math
+import random as r
+from time import perf_counter
+from typing import Callable, Iterator, Literal
+
+from utils.algo_utils import CLOCK_CHECK_EVERY, _is_at_bound, optimize_schedule
+from utils.guard_utils import GuardTable
+from utils.helpers import (
+    _day_of_the_week,
+    _dayshift,
+    _get_day_coverage,
+    _get_days_score,
+    _get_feasible_swap_list,
+    _get_night_count,
+    _get_quota,
+    _get_swap_delta,
+    _get_weekday_index,
+    _get_zone_masks,
+    _init_guards_quantity_per_weekday,
+    _nightshift,
+)
+from utils.move_utils import MoveKind, Neighbourhood
+from utils.schedule_utils import Move, Schedule
+
+Engine = Literal["hill", "anneal", "tabu", "lns"]
+
+# (t_start, t_end, progress in [0, 1]) -> temperature
+Cooling = Callable[[float, float, float], float]
+
+REHEAT_CYCLES = 4
+DEFAULT_TIME_BUDGET = 1.0
+# iterations when neither `max_iter` nor `time_budget` is given; either limit
+# alone holds on its own, with both the first one reached stops the search
+DEFAULT_MAX_ITER = 10_000
+
+# ALNS scores: new global best / improvement / accepted / rejected
+LNS_SCORES = (5.0, 3.0, 1.0, 0.0)
+LNS_MIN_WEIGHT = 0.05
+
+
+def _geometric_cooling(t_start: float, t_end: float, progress: float) -> float:
+    return t_start * (t_end / t_start) ** progress
+
+
+def _linear_cooling(t_start: float, t_end: float, progress: float) -> float:
+    return t_start + (t_end - t_start) * progress
+
+
+def _reheating_cooling(t_start: float, t_end: float, progress: float) -> float:
+    # geometric cooling restarted REHEAT_CYCLES times within the budget
+    cycle_progress = (progress * REHEAT_CYCLES) % 1.0
+    return _geometric_cooling(t_start, t_end, cycle_progress)
+
+
+COOLING_SCHEDULES: dict[str, Cooling] = {
+    "geometric": _geometric_cooling,
+    "linear": _linear_cooling,
+    "reheating": _reheating_cooling,
+}
+
+
+def _get_objective_weights(V: int) -> tuple[int, int]:
+    # one move changes the fairness penalty by at most 2 and touches at most
+    # three days, so these weights keep pref > coverage > fairness ordering
+    cov_weight = 3
+    pref_weight = cov_weight * (3 * V + 1)
+    return pref_weight, cov_weight
+
+
+def _get_base_score(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    zone_masks: list[int],
+    upper_bound: tuple[int, int] | None,
+) -> tuple[int, int]:
+    # raw scores of the start, only needed to compare against `upper_bound`
+    if upper_bound is None:
+        return 0, 0
+    return _get_days_score(shifts, guards, zone_masks, range(len(shifts)))
+
+
+def _get_stop_reason(
+    since_improved: int,
+    stagnation: int | None,
+    base: tuple[int, int],
+    best_key: tuple[int, int, int],
+    upper_bound: tuple[int, int] | None,
+) -> str | None:
+    # `best_key` is relative to the start, `base` makes it absolute
+    if stagnation is not None and since_improved >= stagnation:
+        return "stagnation"
+    if upper_bound is not None:
+        if _is_at_bound(base[0] + best_key[0], base[1] + best_key[1], upper_bound):
+            return "bound"
+    return None
+
+
+def anneal_schedule(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    rng: r.Random,
+    time_budget: float | None,
+    cooling: Literal["geometric", "linear", "reheating"] | Cooling = "geometric",
+    t_start: float = 6.0,
+    t_end: float = 0.3,
+    max_iter: int | None = None,
+    zone_masks: list[int] | None = None,
+    stats: dict[str, int] | None = None,
+    moves: dict[MoveKind, float] | None = None,
+    stagnation: int | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    on_improve: Callable[[list[list[int]]], None] | None = None,
+) -> list[list[int]]:
+    # cooling follows the clock with `time_budget`, the iteration count
+    # otherwise (reproducible), whichever is further along with both
+    if time_budget is None and max_iter is None:
+        time_budget = DEFAULT_TIME_BUDGET
+    schedule = Schedule(shifts)
+    days = len(schedule)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
+    weekday_index = _get_weekday_index(guards, days)
+    neighbourhood = Neighbourhood(schedule, guards, zone_masks, weekday_index, moves)
+    cool = COOLING_SCHEDULES[cooling] if isinstance(cooling, str) else cooling
+    pref_weight, cov_weight = _get_objective_weights(len(guards))
+
+    # scores are tracked relative to the starting schedule
+    cur_pref, cur_cov, cur_pen = 0, 0, 0
+    best_key = (0, 0, 0)
+    best = schedule.to_list()
+    base = _get_base_score(schedule.shifts, guards, zone_masks, upper_bound)
+
+    iterations = 0
+    accepted = 0
+    improved = 0
+    since_improved = 0
+    stop_reason = "max_iter"
+    temp = t_start
+    t_begin = perf_counter()
+
+    while max_iter is None or iterations < max_iter:
+        if iterations % CLOCK_CHECK_EVERY == 0:
+            progress = 0.0 if max_iter is None else iterations / max_iter
+            if time_budget is not None:
+                elapsed = (perf_counter() - t_begin) / time_budget
+                if elapsed >= 1.0:
+                    stop_reason = "deadline"
+                    break
+                progress = max(progress, elapsed)
+            temp = cool(t_start, t_end, progress)
+        stop = _get_stop_reason(since_improved, stagnation, base, best_key, upper_bound)
+        if stop is not None:
+            stop_reason = stop
+            break
+        iterations += 1
+        since_improved += 1
+
+        move, _ = neighbourhood.sample(rng)
+        if move is None:
+            continue
+
+        valid, d_pref, d_cov, d_pen = neighbourhood.delta(move)
+        if not valid:
+            continue
+
+        gain = pref_weight * d_pref + cov_weight * d_cov - d_pen
+        if gain < 0 and rng.random() >= math.exp(gain / temp):
+            continue
+
+        neighbourhood.apply(move)
+        accepted += 1
+        cur_pref += d_pref
+        cur_cov += d_cov
+        cur_pen += d_pen
+
+        key = (cur_pref, cur_cov, -cur_pen)
+        if key > best_key:
+            best_key = key
+            best = schedule.to_list()
+            improved += 1
+            since_improved = 0
+            if on_improve is not None:
+                on_improve(schedule.shifts)
+
+    if stats is not None:
+        stats["iterations"] = stats.get("iterations", 0) + iterations
+        stats["accepted"] = stats.get("accepted", 0) + accepted
+        stats["improved"] = stats.get("improved", 0) + improved
+        stats["stop_reason"] = stop_reason
+
+    return best
+
+
+def _run_metropolis(
+    schedule: Schedule,
+    guards: GuardTable,
+    rng: r.Random,
+    temp: float,
+    steps: int,
+    zone_masks: list[int],
+    weekday_index: tuple[list[int], list[list[int]], dict[int, list[int]]],
+    moves: dict[MoveKind, float] | None = None,
+) -> tuple[tuple[int, int, int], tuple[int, int, int], list[list[int]] | None, int]:
+    # fixed-temperature chain (one replica of parallel tempering); returns the
+    # final (pref, cov, penalty) delta, the best (pref, cov, -penalty) delta
+    # with its schedule (None if the start was never beaten) and accepted moves
+    pref_weight, cov_weight = _get_objective_weights(len(guards))
+    neighbourhood = Neighbourhood(schedule, guards, zone_masks, weekday_index, moves)
+
+    cur_pref, cur_cov, cur_pen = 0, 0, 0
+    best_key = (0, 0, 0)
+    best = None
+    accepted = 0
+
+    for _ in range(steps):
+        move, _ = neighbourhood.sample(rng)
+        if move is None:
+            continue
+
+        valid, d_pref, d_cov, d_pen = neighbourhood.delta(move)
+        if not valid:
+            continue
+
+        gain = pref_weight * d_pref + cov_weight * d_cov - d_pen
+        if gain < 0 and rng.random() >= math.exp(gain / temp):
+            continue
+
+        neighbourhood.apply(move)
+        accepted += 1
+        cur_pref += d_pref
+        cur_cov += d_cov
+        cur_pen += d_pen
+
+        key = (cur_pref, cur_cov, -cur_pen)
+        if key > best_key:
+            best_key = key
+            best = schedule.to_list()
+
+    return (cur_pref, cur_cov, cur_pen), best_key, best, accepted
+
+
+def _iter_all_swaps(days: int) -> Iterator[Move]:
+    for d1 in range(days - 1):
+        for d2 in range(d1 + 1, days):
+            for slot in range(3):
+                yield (d1, d2, slot)
+
+
+def _iter_sampled_swaps(
+    schedule: Schedule,
+    weekday_index: tuple[list[int], list[list[int]], dict[int, list[int]]],
+    rng: r.Random,
+    sample_size: int,
+) -> Iterator[Move]:
+    for _ in range(sample_size):
+        move, _ = _get_feasible_swap_list(schedule, weekday_index, rng)
+        if move is not None:
+            yield move
+
+
+def tabu_search(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    rng: r.Random,
+    max_iter: int | None,
+    time_budget: float | None = None,
+    tenure: int = 20,
+    sample_size: int | None = 100,
+    zone_masks: list[int] | None = None,
+    stats: dict | None = None,
+    stagnation: int | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    on_improve: Callable[[list[list[int]]], None] | None = None,
+) -> list[list[int]]:
+    schedule = Schedule(shifts)
+    shifts_cur = schedule.shifts
+    days = len(schedule)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
+    weekday_index = _get_weekday_index(guards, days)
+    pref_weight, cov_weight = _get_objective_weights(len(guards))
+
+    # (day, slot, guard) -> first iteration at which the guard may return there
+    tabu: dict[tuple[int, int, int], int] = {}
+
+    cur_pref, cur_cov, cur_pen = 0, 0, 0
+    best_key = (0, 0, 0)
+    best = schedule.to_list()
+    base = _get_base_score(shifts_cur, guards, zone_masks, upper_bound)
+
+    iterations = 0
+    accepted = 0
+    improved = 0
+    aspirations = 0
+    since_improved = 0
+    stop_reason = "max_iter"
+    t_begin = perf_counter()
+
+    while max_iter is None or iterations < max_iter:
+        if time_budget is not None and iterations % 16 == 0:
+            if perf_counter() - t_begin >= time_budget:
+                stop_reason = "deadline"
+                break
+        stop = _get_stop_reason(since_improved, stagnation, base, best_key, upper_bound)
+        if stop is not None:
+            stop_reason = stop
+            break
+        iterations += 1
+        since_improved += 1
+
+        if sample_size is None:
+            candidates = _iter_all_swaps(days)
+        else:
+            candidates = _iter_sampled_swaps(schedule, weekday_index, rng, sample_size)
+
+        best_move: Move | None = None
+        best_gain = 0
+        best_delta = (0, 0, 0)
+        best_aspired = False
+
+        for move in candidates:
+            d1, d2, slot = move
+            idx_g1 = shifts_cur[d1][slot]
+            idx_g2 = shifts_cur[d2][slot]
+            if idx_g1 == idx_g2:
+                continue
+
+            valid, d_pref, d_cov, d_pen = _get_swap_delta(
+                schedule, guards, zone_masks, move
+            )
+            if not valid:
+                continue
+
+            gain = pref_weight * d_pref + cov_weight * d_cov - d_pen
+            if best_move is not None and gain <= best_gain:
+                continue
+
+            aspired = False
+            is_tabu = (
+                tabu.get((d1, slot, idx_g2), 0) > iterations
+                or tabu.get((d2, slot, idx_g1), 0) > iterations
+            )
+            if is_tabu:
+                # aspiration: a tabu move is allowed if it gives a new global best
+                key = (cur_pref + d_pref, cur_cov + d_cov, -(cur_pen + d_pen))
+                if key <= best_key:
+                    continue
+                aspired = True
+
+            best_move = move
+            best_gain = gain
+            best_delta = (d_pref, d_cov, d_pen)
+            best_aspired = aspired
+
+        if best_move is None:
+            continue
+
+        d1, d2, slot = best_move
+        tabu[(d1, slot, shifts_cur[d1][slot])] = iterations + tenure
+        tabu[(d2, slot, shifts_cur[d2][slot])] = iterations + tenure
+        schedule.apply(best_move)
+        accepted += 1
+        aspirations += best_aspired
+
+        d_pref, d_cov, d_pen = best_delta
+        cur_pref += d_pref
+        cur_cov += d_cov
+        cur_pen += d_pen
+
+        key = (cur_pref, cur_cov, -cur_pen)
+        if key > best_key:
+            best_key = key
+            best = schedule.to_list()
+            improved += 1
+            since_improved = 0
+            if on_improve is not None:
+                on_improve(schedule.shifts)
+
+    if stats is not None:
+        elapsed = perf_counter() - t_begin
+        stats["iterations"] = stats.get("iterations", 0) + iterations
+        stats["accepted"] = stats.get("accepted", 0) + accepted
+        stats["improved"] = stats.get("improved", 0) + improved
+        stats["aspirations"] = stats.get("aspirations", 0) + aspirations
+        stats["stop_reason"] = stop_reason
+        stats["iterations_per_sec"] = iterations / elapsed if elapsed > 0 else 0.0
+
+    return best
+
+
+def _destroy_random(
+    shifts: list[list[int]],
+    zone_masks: list[int],
+    days_by_weekday: dict[int, list[int]],
+    rng: r.Random,
+    size: int,
+) -> list[int]:
+    return rng.sample(range(len(shifts)), size)
+
+
+def _destroy_weekday(
+    shifts: list[list[int]],
+    zone_masks: list[int],
+    days_by_weekday: dict[int, list[int]],
+    rng: r.Random,
+    size: int,
+) -> list[int]:
+    weekday = rng.choice([d for d in days_by_weekday if days_by_weekday[d]])
+    same_weekday = days_by_weekday[weekday]
+    return rng.sample(same_weekday, min(size, len(same_weekday)))
+
+
+def _destroy_worst_coverage(
+    shifts: list[list[int]],
+    zone_masks: list[int],
+    days_by_weekday: dict[int, list[int]],
+    rng: r.Random,
+    size: int,
+) -> list[int]:
+    day_cov = [_get_day_coverage(s, zone_masks) for s in shifts]
+    by_coverage = sorted(range(len(shifts)), key=lambda idx_d: day_cov[idx_d])
+    worst = by_coverage[: 2 * size]
+    return rng.sample(worst, min(size, len(worst)))
+
+
+DESTROY_OPERATORS = {
+    "random": _destroy_random,
+    "weekday": _destroy_weekday,
+    "worst_coverage": _destroy_worst_coverage,
+}
+
+
+def _get_penalty_from_counts(day_count: list[int], night_count: list[int]) -> int:
+    total_count = [d + n for d, n in zip(day_count, night_count)]
+    return max(0, max(total_count) - min(total_count) - 1)
+
+
+def _recreate_days(
+    guards: GuardTable,
+    shifts: list[list[int]],
+    destroyed: list[int],
+    quotas: dict[str, int],
+    quantity_per_weekday: dict[int, int],
+    day_count: list[int],
+    night_count: list[int],
+    rng: r.Random,
+) -> None:
+    for idx_d in destroyed:
+        g_d, g_n1, g_n2 = shifts[idx_d]
+        day_count[g_d] -= 1
+        night_count[g_n1] -= 1
+        night_count[g_n2] -= 1
+        shifts[idx_d][:] = [-1, -1, -1]
+
+    # hardest days first as in `_days_sorted_by_difficulty`, random among equals
+    available: list[tuple[int, int, int]] = []
+    for idx_d in destroyed:
+        weekday = _day_of_the_week(idx_d + 1)
+        available.append((idx_d + 1, weekday, quantity_per_weekday[weekday]))
+    rng.shuffle(available)
+    available.sort(key=lambda x: x[2])
+
+    extra_day_used = sum(1 for c in day_count if c > quotas["q_d"])
+    extra_night_used = sum(1 for c in night_count if c > quotas["q_n"])
+
+    _dayshift(guards, available, quotas, day_count, shifts, extra_day_used, set())
+    _, extra_night_used, _, unavailable_night_guards = _nightshift(
+        guards,
+        available,
+        quotas,
+        day_count,
+        night_count,
+        shifts,
+        extra_night_used,
+        set(),
+        nightshift_num=1,
+    )
+    _nightshift(
+        guards,
+        available,
+        quotas,
+        day_count,
+        night_count,
+        shifts,
+        extra_night_used,
+        unavailable_night_guards,
+        nightshift_num=2,
+    )
+
+
+def lns_schedule(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    rng: r.Random,
+    max_iter: int | None,
+    time_budget: float | None = None,
+    destroy_size: int = 6,
+    reaction: float = 0.1,
+    zone_masks: list[int] | None = None,
+    stats: dict | None = None,
+    stagnation: int | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    on_improve: Callable[[list[list[int]]], None] | None = None,
+) -> list[list[int]]:
+    schedule = Schedule(shifts)
+    shifts_cur = schedule.shifts
+    V = len(guards)
+    days = len(schedule)
+    destroy_size = min(destroy_size, days)
+    if zone_masks is None:
+        zone_masks = _get_zone_masks(guards)
+    quotas = _get_quota(guards, days)
+    quantity_per_weekday = _init_guards_quantity_per_weekday(guards)
+    _, _, days_by_weekday = _get_weekday_index(guards, days)
+
+    day_count = [0] * V
+    for s in shifts_cur:
+        day_count[s[0]] += 1
+    night_count = _get_night_count(shifts_cur, V)
+
+    operators = list(DESTROY_OPERATORS)
+    weights = [1.0] * len(operators)
+    op_used = [0] * len(operators)
+    op_improved = [0] * len(operators)
+
+    # pref and coverage relative to the starting schedule, penalty absolute
+    cur_key = (0, 0, -_get_penalty_from_counts(day_count, night_count))
+    best_key = cur_key
+    best = schedule.to_list()
+    base = _get_base_score(shifts_cur, guards, zone_masks, upper_bound)
+
+    iterations = 0
+    accepted = 0
+    improved = 0
+    since_improved = 0
+    stop_reason = "max_iter"
+    t_begin = perf_counter()
+
+    while max_iter is None or iterations < max_iter:
+        if time_budget is not None and iterations % 16 == 0:
+            if perf_counter() - t_begin >= time_budget:
+                stop_reason = "deadline"
+                break
+        stop = _get_stop_reason(since_improved, stagnation, base, best_key, upper_bound)
+        if stop is not None:
+            stop_reason = stop
+            break
+        iterations += 1
+        since_improved += 1
+
+        op = rng.choices(range(len(operators)), weights)[0]
+        op_used[op] += 1
+        destroyed = DESTROY_OPERATORS[operators[op]](
+            shifts_cur, zone_masks, days_by_weekday, rng, destroy_size
+        )
+
+        old_rows = [shifts_cur[idx_d].copy() for idx_d in destroyed]
+        old_day_count = day_count.copy()
+        old_night_count = night_count.copy()
+        pref_before, cov_before = _get_days_score(
+            shifts_cur, guards, zone_masks, destroyed
+        )
+
+        _recreate_days(
+            guards,
+            shifts_cur,
+            destroyed,
+            quotas,
+            quantity_per_weekday,
+            day_count,
+            night_count,
+            rng,
+        )
+
+        pref_after, cov_after = _get_days_score(
+            shifts_cur, guards, zone_masks, destroyed
+        )
+        new_key = (
+            cur_key[0] + pref_after - pref_before,
+            cur_key[1] + cov_after - cov_before,
+            -_get_penalty_from_counts(day_count, night_count),
+        )
+
+        if new_key < cur_key:
+            for idx_d, row in zip(destroyed, old_rows):
+                shifts_cur[idx_d][:] = row
+            day_count = old_day_count
+            night_count = old_night_count
+            score = LNS_SCORES[3]
+        else:
+            score = LNS_SCORES[2]
+            if new_key > cur_key:
+                score = LNS_SCORES[1]
+                op_improved[op] += 1
+            if new_key > best_key:
+                score = LNS_SCORES[0]
+                best_key = new_key
+                best = schedule.to_list()
+                improved += 1
+                since_improved = 0
+                if on_improve is not None:
+                    on_improve(shifts_cur)
+            cur_key = new_key
+            accepted += 1
+
+        weights[op] = max(
+            LNS_MIN_WEIGHT, (1 - reaction) * weights[op] + reaction * score
+        )
+
+    if stats is not None:
+        stats["iterations"] = stats.get("iterations", 0) + iterations
+        stats["accepted"] = stats.get("accepted", 0) + accepted
+        stats["improved"] = stats.get("improved", 0) + improved
+        stats["stop_reason"] = stop_reason
+        for i, name in enumerate(operators):
+            stats[f"{name}_used"] = stats.get(f"{name}_used", 0) + op_used[i]
+            stats[f"{name}_improved"] = (
+                stats.get(f"{name}_improved", 0) + op_improved[i]
+            )
+            stats[f"{name}_weight"] = weights[i]
+
+    return best
+
+
+def run_engine(
+    shifts: list[list[int]],
+    guards: GuardTable,
+    rng: r.Random,
+    engine: Engine,
+    max_iter: int | None,
+    time_budget: float | None = None,
+    zone_masks: list[int] | None = None,
+    stats: dict | None = None,
+    stagnation: int | None = None,
+    upper_bound: tuple[int, int] | None = None,
+    moves: dict[MoveKind, float] | None = None,
+    on_improve: Callable[[list[list[int]]], None] | None = None,
+) -> list[list[int]]:
+    # `moves` mixes in the extra move types for hill climbing and annealing,
+    # `on_improve` gets the current schedule whenever it improved
+    if max_iter is None and time_budget is None:
+        max_iter = DEFAULT_MAX_ITER
+    if engine == "anneal":
+        return anneal_schedule(
+            shifts,
+            guards,
+            rng,
+            time_budget,
+            max_iter=max_iter,
+            zone_masks=zone_masks,
+            stats=stats,
+            moves=moves,
+            stagnation=stagnation,
+            upper_bound=upper_bound,
+            on_improve=on_improve,
+        )
+    if engine == "lns":
+        return lns_schedule(
+            shifts,
+            guards,
+            rng,
+            max_iter,
+            time_budget,
+            zone_masks=zone_masks,
+            stats=stats,
+            stagnation=stagnation,
+            upper_bound=upper_bound,
+            on_improve=on_improve,
+        )
+    if engine == "tabu":
+        return tabu_search(
+            shifts,
+            guards,
+            rng,
+            max_iter,
+            time_budget,
+            zone_masks=zone_masks,
+            stats=stats,
+            stagnation=stagnation,
+            upper_bound=upper_bound,
+            on_improve=on_improve,
+        )
+    return optimize_schedule(
+        shifts,
+        guards,
+        rng,
+        max_iter,
+        zone_masks,
+        stats=stats,
+        stagnation=stagnation,
+        time_budget=time_budget,
+        upper_bound=upper_bound,
+        on_improve=on_improve,
+        moves=moves,
+    )
@@ -0,0 +1,28 @@
+import hashlib
+import random as r
+
+# every random stream is named by a path below the root seed, e.g.
+# ("start", 3) or ("chain", 1, 17); its seed depends on nothing but the root
+# and the path, so no two streams overlap and the worker count does not matter
+SEED_SCHEME = "blake2b-64(root/path)"
+
+
+def derive_seed(root: int, *path: int | str) -> int:
+    # the empty path is the root stream itself (`random.Random(seed)`)
+    if not path:
+        return root
+    key = "/".join(str(x) for x in (root, *path)).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def spawn_rng(root: int, *path: int | str) -> r.Random:
+    return r.Random(derive_seed(root, *path))
+
+
+def get_stream_name(*path: int | str) -> str:
+    return "/".join(str(x) for x in path) or "root"
+
+
+def get_rng_record(root: int, phases: dict[str, dict[str, int] | None]) -> dict:
+    # stream name -> seed for every phase, None for phases without randomness
+    return {"root": root, "scheme": SEED_SCHEME, "phases": phases}
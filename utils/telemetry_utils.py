@@ -0,0 +1,74 @@
+import cProfile
+import io
+import json
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator
+
+PROFILE_TOP = 25
+
+
+def new_telemetry() -> dict:
+    return {"phases": {}, "search": {}}
+
+
+@contextmanager
+def phase(telemetry: dict, name: str) -> Iterator[None]:
+    t = perf_counter()
+    try:
+        yield
+    finally:
+        phases = telemetry["phases"]
+        phases[name] = phases.get(name, 0.0) + perf_counter() - t
+
+
+@contextmanager
+def profile_hooks(
+    telemetry: dict, profile: bool = False, trace_memory: bool = False
+) -> Iterator[None]:
+    profiler = cProfile.Profile() if profile else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(
+                PROFILE_TOP
+            )
+            telemetry["profile"] = out.getvalue()
+
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top = snapshot.statistics("lineno")[:PROFILE_TOP]
+            telemetry["memory"] = {
+                "peak_bytes": peak,
+                "top": [
+                    {"where": str(st.traceback), "bytes": st.size, "count": st.count}
+                    for st in top
+                ],
+            }
+
+
+def finish_search_telemetry(telemetry: dict, stats: dict) -> None:
+    search = telemetry["search"]
+    search.update(stats)
+
+    elapsed = telemetry["phases"].get("optimization", 0.0)
+    iterations = stats.get("iterations", 0)
+    search["iterations_per_sec"] = iterations / elapsed if elapsed > 0 else 0.0
+
+
+def save_telemetry(fout: Path, telemetry: dict) -> None:
+    with open(file=fout, encoding="utf-8", mode="w") as f:
+        json.dump(telemetry, f, indent=2)